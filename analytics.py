@@ -0,0 +1,166 @@
+# analytics.py
+"""
+Dataset-level analytics shared by the pages and the offline bundle builder
+(``bundle.py``): character graphs and their communities and centralities,
+greedy coverage orders, count cubes and character tone profiles. Inputs are
+the prepared tables from ``dataset``; nothing here depends on a session.
+"""
+from collections import Counter
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from bitmap import BitmapIndex
+from coverage import CoverageEngine, coverage_curve
+from cube import CountCube
+from dataset import CLASS_CODE_COL
+from deck_sampling import frequency_weights
+
+PHON_COLS = ["initial_1", "final_1", "initial_2", "final_2"]
+COVERAGE_COLS = ["char1", "char2", "Verb", "pinyin", "English_Verb"]
+# Tone Explorer families: communities of at least this many characters
+FAMILY_MIN_SIZE = 6
+
+
+def char_graph(rows, members=None):
+    """Character Network graph: one edge per verb, titled "verb (pinyin)"."""
+    if members is not None:
+        rows = rows[rows["char1"].isin(members) & rows["char2"].isin(members)]
+    G = nx.DiGraph()
+    for _, row in rows.iterrows():
+        if pd.notna(row["char1"]) and pd.notna(row["char2"]):
+            G.add_edge(row["char1"], row["char2"], title=f"{row['Verb']} ({row['pinyin']})")
+    return G
+
+
+def communities(G):
+    """Modularity communities of ``G`` (undirected), largest first."""
+    found = nx.community.greedy_modularity_communities(G.to_undirected())
+    return sorted([list(c) for c in found], key=len, reverse=True)
+
+
+def centrality(G, progress=None):
+    """
+    Degree and betweenness centrality per character. ``progress(fraction)``,
+    if given, is called as betweenness works through the source nodes.
+    """
+    if progress is None:
+        return nx.degree_centrality(G), nx.betweenness_centrality(G)
+    between = dict.fromkeys(G, 0.0)
+    for i, s in enumerate(G):
+        _accumulate(G, s, between)
+        progress((i + 1) / len(G))
+    n = len(G)
+    scale = 1 / ((n - 1) * (n - 2)) if n > 2 else None
+    if scale is not None:
+        between = {v: b * scale for v, b in between.items()}
+    return nx.degree_centrality(G), between
+
+
+def _accumulate(G, s, between):
+    """Brandes' dependency accumulation for source ``s`` (unweighted), as networkx does it."""
+    S, P, sigma, D = [], {v: [] for v in G}, dict.fromkeys(G, 0.0), {s: 0}
+    sigma[s] = 1.0
+    queue = [s]
+    for v in queue:
+        S.append(v)
+        for w in G[v]:
+            if w not in D:
+                queue.append(w)
+                D[w] = D[v] + 1
+            if D[w] == D[v] + 1:
+                sigma[w] += sigma[v]
+                P[w].append(v)
+    delta = dict.fromkeys(S, 0.0)
+    while S:
+        w = S.pop()
+        coeff = (1 + delta[w]) / sigma[w]
+        for v in P[w]:
+            delta[v] += sigma[v] * coeff
+        if w != s:
+            between[w] += delta[w]
+
+
+def tone_graph(edge_df):
+    """Tone Explorer graph over the weighted edge table, with each node's dominant tone."""
+    G = nx.DiGraph()
+    for _, r in edge_df.iterrows():
+        G.add_edge(r["char1"], r["char2"],
+                   tone_pair=r["tone_pattern"], src_tone=int(r["src_tone"]), dst_tone=int(r["dst_tone"]),
+                   weight=int(r["weight"]),
+                   verb=r.get("Verb"), pinyin=r.get("pinyin"), english=r.get("English_Verb"),
+                   cls_zh=r.get("Classification_zh"), cls_en=r.get("Classification_en"))
+    node_tone = {}
+    for n in G.nodes():
+        tones = [d["dst_tone"] for _, _, d in G.in_edges(n, data=True)]
+        tones += [d["src_tone"] for _, _, d in G.out_edges(n, data=True)]
+        if tones:
+            counts = Counter(tones)
+            node_tone[n] = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[0][0]
+    nx.set_node_attributes(G, node_tone, "tone")
+    return G
+
+
+def tone_families(G, edge_df):
+    """
+    Character families (modularity communities of size >= ``FAMILY_MIN_SIZE``
+    on the full tone graph) and a weighted community × tone pair × src × dst
+    cube of their intra-family edges.
+    """
+    comms = [c for c in nx.community.greedy_modularity_communities(G.to_undirected()) if len(c) >= FAMILY_MIN_SIZE]
+    return comms, family_cube(comms, edge_df)
+
+
+def family_cube(comms, edge_df):
+    member = {ch: i for i, c in enumerate(comms) for ch in c}
+    fam1 = edge_df["char1"].map(member)
+    fam2 = edge_df["char2"].map(member)
+    intra = edge_df.assign(family=fam1.where(fam1 == fam2))
+    return CountCube(intra, ["family", "tone_pattern", "src_tone", "dst_tone"], weight="weight")
+
+
+def coverage_edges(edge_df):
+    """One edge per distinct verb for the coverage optimizer, plus its class bitsets."""
+    cls_cols = [c for c in (CLASS_CODE_COL, "Classification_zh", "Classification_en") if c in edge_df.columns]
+    edges = edge_df[COVERAGE_COLS + cls_cols].drop_duplicates(subset=COVERAGE_COLS).reset_index(drop=True)
+    return edges, BitmapIndex(edges, [CLASS_CODE_COL] if CLASS_CODE_COL in edges.columns else [])
+
+
+def coverage_weights(edges, pair_freq, weighting="uniform", mask=None):
+    """Edge weights: uniform or verb frequency ("freq"), zeroed outside ``mask``."""
+    weights = np.ones(len(edges))
+    if weighting == "freq":
+        weights = frequency_weights(edges, pair_freq)
+    if mask is not None:
+        weights = weights * mask
+    return weights
+
+
+def greedy_coverage(edges, weights, known=()):
+    """
+    Full greedy pick order by characters, with each edge's cover rank and the
+    coverage curve. Greedy cover is prefix-consistent, so any k is a slice.
+    """
+    engine = CoverageEngine(edges["char1"], edges["char2"], weights)
+    picks, edge_rank = engine.greedy(known=engine.codes(known))
+    return engine.chars[picks].tolist(), edge_rank, coverage_curve(picks, edge_rank, engine.weights)
+
+
+def count_cubes(df, edge_df):
+    """Count cubes (class × src tone × dst tone [× component]) for the coach overview and tone heatmap."""
+    tone_dims = ([CLASS_CODE_COL] if CLASS_CODE_COL in edge_df.columns else []) + ["src_tone", "dst_tone"]
+    cubes = {"rows": CountCube(df, tone_dims), "edges": CountCube(edge_df, tone_dims)}
+    for col in PHON_COLS:
+        if col in df.columns:
+            cubes[col] = CountCube(df, tone_dims + [col])
+    return cubes
+
+
+def char_profiles(df):
+    """Character × position (1 = first, 2 = second) × tone counts over the prepared tone rows."""
+    long = pd.concat([
+        pd.DataFrame({"char": df["char1"].to_numpy(), "position": 1, "tone": df["src_tone"].to_numpy()}),
+        pd.DataFrame({"char": df["char2"].to_numpy(), "position": 2, "tone": df["dst_tone"].to_numpy()}),
+    ], ignore_index=True)
+    return CountCube(long, ["char", "position", "tone"])
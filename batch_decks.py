@@ -0,0 +1,167 @@
+# batch_decks.py
+"""
+Generate study decks for a whole roster without clicking through the UI.
+
+Each roster row is one student deck. Decks are built with the same
+preparation and sampling code as the Deck Builder (page 3, ``builder=coach``)
+and the Curriculum Builder (page 4, ``builder=curriculum``), so a row with a
+given seed and parameters yields exactly the deck the UI shows for them.
+
+Roster columns (CSV; only ``student`` is required):
+  student     identifier copied to the output
+  seed        random seed (default 42, the UI default)
+  builder     coach | curriculum (default coach)
+  tone_pairs  tone pairs separated by ";" e.g. "3-4;2-5" (blank = all)
+  position    coach only: initial_1 | final_1 | initial_2 | final_2
+  components  coach only: components for that position, e.g. "zh;ch;sh"
+  query       compound phonetic query, e.g. "i1 in zh,ch,sh and f2 endswith ng"
+  size        deck size (default 40)
+  weighting   curriculum only: degree | uniform (default degree)
+
+Usage:
+  python batch_decks.py roster.csv --out decks.parquet --workers 8
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from bitmap import BitmapIndex
+from dataset import CLASS_CODE_COL, prepare_coach, prepare_tones, read_verbs
+from deck_sampling import (DEFAULT_SEED, EdgeIndex, coach_deck, curriculum_deck, edge_frequency,
+                           frequency_weights)
+from phonetic_query import QUERY_FIELDS, parse_query, query_rows
+
+DEFAULT_DATA = "data/two_char_verbs_with_Tr_Pro_with_UMAP.csv"
+COMPONENT_COLS = ("initial_1", "final_1", "initial_2", "final_2")
+
+# Per-worker dataset snapshot, filled once by _init_worker
+_SNAPSHOT = {}
+
+
+def build_snapshot(raw: pd.DataFrame, lang: str = "en") -> dict:
+    """Prepared tables and indexes for both builders, computed once per run."""
+    coach_df, coach_edges = prepare_coach(raw.copy())
+    tone_df, tone_edges = prepare_tones(raw.copy())
+    tone_dims = [c for c in QUERY_FIELDS if c in tone_edges.columns] + ([CLASS_CODE_COL] if CLASS_CODE_COL in tone_edges.columns else [])
+    return {
+        "coach_edges": coach_edges,
+        "coach_freq": frequency_weights(coach_edges, edge_frequency(coach_df)),
+        "coach_bitmap": BitmapIndex(coach_edges, [c for c in QUERY_FIELDS if c in coach_edges.columns]),
+        "tone_edges": tone_edges,
+        "tone_index": EdgeIndex(tone_edges),
+        "tone_bitmap": BitmapIndex(tone_edges, tone_dims),
+        "tone_where": _tone_default_where(tone_edges),
+        "lang": lang,
+    }
+
+
+def _init_worker(snapshot):
+    _SNAPSHOT.update(snapshot)
+
+
+def _split(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    return [v.strip() for v in str(value).split(";") if v.strip()]
+
+
+def _tone_default_where(edges, cls_col=CLASS_CODE_COL):
+    """Page 4 sidebar defaults: every tone pair, tone and (non-empty) class code."""
+    where = {
+        "tone_pattern": sorted(edges["tone_pattern"].dropna().unique()),
+        "src_tone": sorted(edges["src_tone"].dropna().unique()),
+        "dst_tone": sorted(edges["dst_tone"].dropna().unique()),
+    }
+    classes = sorted(edges[cls_col].dropna().unique()) if cls_col in edges.columns else []
+    if classes:
+        where[cls_col] = classes
+    return where
+
+
+def make_deck(job: dict) -> pd.DataFrame:
+    """Build one roster row's deck from the worker snapshot."""
+    lang = _SNAPSHOT["lang"]
+    seed = int(job.get("seed", DEFAULT_SEED))
+    size = int(job.get("size", 40))
+    pairs = _split(job.get("tone_pairs"))
+    clauses = parse_query(job.get("query", ""))
+
+    if job.get("builder", "coach") == "curriculum":
+        where = dict(_SNAPSHOT["tone_where"])
+        if pairs:
+            where["tone_pattern"] = [p for p in where["tone_pattern"] if p in pairs]
+        rows = query_rows(_SNAPSHOT["tone_bitmap"], clauses, where)
+        by_degree = str(job.get("weighting", "degree")).strip().lower() != "uniform"
+        deck = curriculum_deck(_SNAPSHOT["tone_edges"], _SNAPSHOT["tone_index"], rows,
+                               by_degree=by_degree, size=size, seed=seed)
+    else:
+        where = {"tone_pattern": pairs} if pairs else {}
+        position, components = job.get("position"), _split(job.get("components"))
+        if position in COMPONENT_COLS and components:
+            where[position] = components
+        rows = query_rows(_SNAPSHOT["coach_bitmap"], clauses, where)
+        deck = coach_deck(_SNAPSHOT["coach_edges"], _SNAPSHOT["coach_freq"], rows, size, seed, lang)
+
+    deck.insert(0, "student", job["student"])
+    deck.insert(1, "seed", seed)
+    return deck
+
+
+def _run_chunk(jobs):
+    return [make_deck(job) for job in jobs]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate study decks for a roster of students.")
+    parser.add_argument("roster", help="CSV with one row per student deck")
+    parser.add_argument("--out", required=True, help="output file (.csv or .parquet)")
+    parser.add_argument("--data", default=DEFAULT_DATA, help="verbs snapshot (CSV or Parquet)")
+    parser.add_argument("--lang", choices=["en", "zh"], default="en", help="classification language")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--chunk", type=int, default=64, help="roster rows per task")
+    args = parser.parse_args(argv)
+
+    roster = pd.read_csv(args.roster, dtype=str, keep_default_na=False)
+    if "student" not in roster.columns:
+        parser.error("roster must have a 'student' column")
+    roster = roster.replace("", np.nan)
+    jobs = [{k: v for k, v in row.items() if not pd.isna(v)} for row in roster.to_dict("records")]
+    for i, job in enumerate(jobs):
+        if "student" not in job:
+            parser.error(f"roster row {i + 1}: empty student")
+        row = f"roster row {i + 1} ({job['student']})"
+        for col, minimum in (("seed", 0), ("size", 1)):
+            if col in job:
+                try:
+                    job[col] = int(job[col])
+                except ValueError:
+                    parser.error(f"{row}: {col} must be a whole number, got {job[col]!r}")
+                if job[col] < minimum:
+                    parser.error(f"{row}: {col} must be at least {minimum}, got {job[col]}")
+        try:
+            parse_query(job.get("query", ""))
+        except ValueError as e:
+            parser.error(f"{row}: bad query: {e}")
+
+    snapshot = build_snapshot(read_verbs(args.data), args.lang)
+    chunks = [jobs[i:i + args.chunk] for i in range(0, len(jobs), args.chunk)]
+
+    decks = []
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(snapshot,)) as pool:
+        for chunk_decks in pool.map(_run_chunk, chunks):
+            decks.extend(chunk_decks)
+
+    out = pd.concat(decks, ignore_index=True) if decks else pd.DataFrame()
+    if args.out.endswith(".parquet"):
+        out.to_parquet(args.out, index=False)
+    else:
+        out.to_csv(args.out, index=False)
+    print(f"Wrote {len(decks)} decks ({len(out)} rows) to {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+# bundle.py
+"""
+Offline analytics bundle for a dataset version.
+
+Computes everything the pages derive from the dataset alone (the character
+and tone graphs, their communities and centralities, greedy coverage orders,
+minimal pairs, count cubes and character tone profiles) and stores it under
+``artifacts/<dataset version>/bundle/``: tables as Parquet, arrays as
+compressed NumPy archives, and a ``manifest.json`` listing each result with
+the compute-cache key it answers. Pages preload the bundle of their dataset
+version at startup, so the default views only slice and render.
+
+The Character Network's graph, communities and centralities are
+materialised for the common class filters (all classes, each single class,
+each all-but-one), computed in parallel across worker processes; other
+combinations are computed live. Single-class tone heatmaps are slices of
+the bundled count cubes. Graph layouts are not bundled: the network views
+lay out in the browser.
+
+Usage:
+  python bundle.py --data data/two_char_verbs_with_Tr_Pro_with_UMAP.csv --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+import analytics
+from bitmap import BitmapIndex
+from compute_cache import filter_key, preload
+from cube import CountCube
+from dataset import CLASS_CODE_COL, option_lists, prepare_coach, prepare_tones, prepare_verbs, read_verbs
+from deck_sampling import edge_frequency
+from minpairs import minimal_pair_table
+
+DEFAULT_DATA = "data/two_char_verbs_with_Tr_Pro_with_UMAP.csv"
+ARTIFACT_DIR = "artifacts"
+BUNDLE_FORMAT = 1
+
+# Rows and class bitsets of the Character Network, per worker process
+_NETWORK = {}
+
+
+def bundle_dir(version, root=ARTIFACT_DIR):
+    return os.path.join(root, version, "bundle")
+
+
+def default_class_filter(rows):
+    """Filter key of the class multiselects' default (every class selected)."""
+    return filter_key({CLASS_CODE_COL: option_lists(rows)["classes"]}) if CLASS_CODE_COL in rows.columns else ()
+
+
+def class_subsets(rows):
+    """
+    Class filter keys worth materialising: every class (the default), each
+    single class and each all-but-one, without duplicates.
+    """
+    where = default_class_filter(rows)
+    if not where:
+        return [where]
+    classes = list(where[0][1])
+    subsets = [classes] + [[c] for c in classes] + [[x for x in classes if x != c] for c in classes]
+    return list(dict.fromkeys(filter_key({CLASS_CODE_COL: s}) for s in subsets if s))
+
+
+def _init_network_worker(rows):
+    _NETWORK["rows"] = rows
+    _NETWORK["bitmap"] = BitmapIndex(rows, [CLASS_CODE_COL] if CLASS_CODE_COL in rows.columns else [])
+
+
+def _network_subset(where):
+    """Graph, communities and centralities of the rows matching one class filter key."""
+    G = analytics.char_graph(_NETWORK["rows"][_NETWORK["bitmap"].mask(dict(where))])
+    return G, analytics.communities(G), analytics.centrality(G)
+
+
+def network_results(rows, wheres, workers=1):
+    """``_network_subset`` for each filter key, across ``workers`` processes."""
+    if workers <= 1 or len(wheres) <= 1:
+        _init_network_worker(rows)
+        return [_network_subset(w) for w in wheres]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_network_worker, initargs=(rows,)) as pool:
+        return list(pool.map(_network_subset, wheres))
+
+
+def build_results(raw, workers=1):
+    """``(name, args, kind, result)`` for every bundled result of a raw verbs table."""
+    out = []
+
+    rows = prepare_verbs(raw.copy())
+    wheres = class_subsets(rows)
+    for where, (G, comms, cent) in zip(wheres, network_results(rows, wheres, workers)):
+        out += [("network.graph", (where,), "graph", G),
+                ("network.communities", (where,), "groups", comms),
+                ("network.centrality", (where,), "centrality", cent)]
+
+    coach_df, coach_edges = prepare_coach(raw.copy())
+    edges, _ = analytics.coverage_edges(coach_edges)
+    pair_freq = edge_frequency(coach_df)
+    for weighting in ("uniform", "freq"):
+        weights = analytics.coverage_weights(edges, pair_freq, weighting)
+        out.append(("coach.greedy_coverage", (weighting, (), ()), "coverage", analytics.greedy_coverage(edges, weights)))
+    out.append(("coach.count_cubes", (), "cubes", analytics.count_cubes(coach_df, coach_edges)))
+
+    tone_df, tone_edges = prepare_tones(raw.copy())
+    T = analytics.tone_graph(tone_edges)
+    out += [("tones.graph", (), "graph", T),
+            ("tones.families", (), "families", analytics.tone_families(T, tone_edges)),
+            ("tones.minimal_pairs", (), "frame", minimal_pair_table(tone_df)),
+            ("tones.char_profiles", (), "cubes", {"profiles": analytics.char_profiles(tone_df)})]
+    return out
+
+
+# --- Writers and readers per kind: each returns / takes {part: file name} ---
+
+def _write_frame(frame, path):
+    frame.to_parquet(path, index=False, compression="zstd")
+
+
+def _write_cube(cube, path):
+    labels = {}
+    for i, d in enumerate(cube.dims):
+        arr = np.asarray(cube.labels[d])
+        if arr.dtype == object:
+            raise ValueError(f"cube dimension '{d}' mixes label types")
+        labels[f"labels_{i}"] = arr
+    np.savez_compressed(path, counts=cube.counts, **labels)
+    return cube.dims
+
+
+def _read_cube(path, dims):
+    with np.load(path, allow_pickle=False) as z:
+        return CountCube.from_counts(dims, {d: z[f"labels_{i}"].tolist() for i, d in enumerate(dims)}, z["counts"])
+
+
+def _write(kind, result, stem):
+    """Write one result; returns the manifest's file list and metadata."""
+    if kind == "graph":
+        nodes = pd.DataFrame([{"node": n, **d} for n, d in result.nodes(data=True)])
+        edges = pd.DataFrame([{"source": u, "target": v, **d} for u, v, d in result.edges(data=True)])
+        _write_frame(nodes, f"{stem}.nodes.parquet")
+        _write_frame(edges, f"{stem}.edges.parquet")
+        return {"nodes": f"{stem}.nodes.parquet", "edges": f"{stem}.edges.parquet"}, {}
+    if kind == "groups":
+        _write_frame(pd.DataFrame([(i, ch) for i, g in enumerate(result) for ch in g], columns=["group", "char"]),
+                     f"{stem}.parquet")
+        return {"groups": f"{stem}.parquet"}, {}
+    if kind == "centrality":
+        degree, between = result
+        _write_frame(pd.DataFrame({"char": list(degree), "degree": list(degree.values()),
+                                   "betweenness": [between[c] for c in degree]}), f"{stem}.parquet")
+        return {"table": f"{stem}.parquet"}, {}
+    if kind == "coverage":
+        order, edge_rank, curve = result
+        np.savez_compressed(f"{stem}.npz", order=np.asarray(order, dtype=str), edge_rank=edge_rank, curve=curve)
+        return {"arrays": f"{stem}.npz"}, {}
+    if kind == "cubes":
+        files, dims = {}, {}
+        for part, cube in result.items():
+            dims[part] = _write_cube(cube, f"{stem}.{part}.npz")
+            files[part] = f"{stem}.{part}.npz"
+        return files, {"dims": dims}
+    if kind == "families":
+        comms, cube = result
+        files, meta = _write("groups", comms, stem)
+        files["cube"] = f"{stem}.cube.npz"
+        meta["dims"] = _write_cube(cube, files["cube"])
+        return files, meta
+    if kind == "frame":
+        _write_frame(result, f"{stem}.parquet")
+        return {"table": f"{stem}.parquet"}, {}
+    raise ValueError(f"unknown result kind '{kind}'")
+
+
+def _records(frame):
+    """Rows as dicts without missing values."""
+    return [{k: v for k, v in r.items() if not (v is None or (isinstance(v, float) and np.isnan(v)))}
+            for r in frame.to_dict("records")]
+
+
+def _read(kind, files, meta, folder):
+    path = {part: os.path.join(folder, name) for part, name in files.items()}
+    if kind == "graph":
+        G = nx.DiGraph()
+        for node in _records(pd.read_parquet(path["nodes"])):
+            G.add_node(node.pop("node"), **node)
+        for edge in _records(pd.read_parquet(path["edges"])):
+            G.add_edge(edge.pop("source"), edge.pop("target"), **edge)
+        return G
+    if kind == "groups":
+        groups = pd.read_parquet(path["groups"])
+        return [g["char"].tolist() for _, g in groups.groupby("group", sort=True)]
+    if kind == "centrality":
+        table = pd.read_parquet(path["table"])
+        return dict(zip(table["char"], table["degree"])), dict(zip(table["char"], table["betweenness"]))
+    if kind == "coverage":
+        with np.load(path["arrays"], allow_pickle=False) as z:
+            return z["order"].tolist(), z["edge_rank"], z["curve"]
+    if kind == "cubes":
+        return {part: _read_cube(p, meta["dims"][part]) for part, p in path.items()}
+    if kind == "families":
+        comms = [frozenset(g) for g in _read("groups", {"groups": files["groups"]}, {}, folder)]
+        return comms, _read_cube(path["cube"], meta["dims"])
+    if kind == "frame":
+        return pd.read_parquet(path["table"])
+    raise ValueError(f"unknown result kind '{kind}'")
+
+
+def _tuples(value):
+    """JSON arrays back to the tuples the cache keys were built from."""
+    return tuple(_tuples(v) for v in value) if isinstance(value, list) else value
+
+
+def write_bundle(raw, root=ARTIFACT_DIR, source=None, workers=1):
+    """Compute and write the bundle for ``raw``'s dataset version; returns the manifest path."""
+    version = raw.attrs["version"]
+    folder = bundle_dir(version, root)
+    os.makedirs(folder, exist_ok=True)
+    entries = []
+    for i, (name, args, kind, result) in enumerate(build_results(raw, workers)):
+        files, meta = _write(kind, result, os.path.join(folder, f"{i:03d}_{name}"))
+        entries.append({"name": name, "args": args, "kind": kind,
+                        "files": {part: os.path.basename(f) for part, f in files.items()}, **meta})
+    manifest = {"format": BUNDLE_FORMAT, "version": version, "source": source,
+                "built": datetime.now(timezone.utc).isoformat(timespec="seconds"), "entries": entries}
+    path = os.path.join(folder, "manifest.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    return path
+
+
+def read_bundle(version, root=ARTIFACT_DIR):
+    """``(manifest, [(name, args, result), ...])`` for a dataset version, or ``(None, [])`` if not built."""
+    folder = bundle_dir(version, root)
+    path = os.path.join(folder, "manifest.json")
+    if not version or not os.path.exists(path):
+        return None, []
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != BUNDLE_FORMAT or manifest.get("version") != version:
+        return None, []
+    return manifest, [(e["name"], _tuples(e["args"]), _read(e["kind"], e["files"], e, folder))
+                      for e in manifest["entries"]]
+
+
+def preload_bundle(version, root=ARTIFACT_DIR):
+    """Seed the compute cache with a version's bundle; returns its manifest (None if not built)."""
+    manifest, results = read_bundle(version, root)
+    for name, args, result in results:
+        preload(name, version, args, result)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the analytics bundle for a dataset version.")
+    parser.add_argument("--data", default=DEFAULT_DATA, help="verbs snapshot (CSV or Parquet)")
+    parser.add_argument("--out-dir", default=ARTIFACT_DIR, help="artifact root")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes for the class subsets")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    raw = read_verbs(args.data)
+    path = write_bundle(raw, args.out_dir, source=os.path.basename(args.data), workers=args.workers)
+    print(f"Built analytics bundle for {len(raw)} rows in {time.perf_counter() - t0:.1f}s -> {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
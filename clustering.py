@@ -0,0 +1,185 @@
+# clustering.py
+"""
+Offline semantic clustering of the verb map.
+
+Runs mini-batch k-means for several k and a density-based clustering over
+the verbs' embedding vectors (or the UMAP coordinates when the snapshot has
+no embeddings), and stores one label column per run under
+``artifacts/<dataset version>/clusters.csv``. Pages only load that file;
+nothing is clustered per session.
+
+Usage:
+  python clustering.py --data data/two_char_verbs_with_Tr_Pro_with_UMAP.csv --ks 8,16,32
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+from dataset import read_verbs
+from semantic import UMAP_COLS, embedding_cols
+
+DEFAULT_DATA = "data/two_char_verbs_with_Tr_Pro_with_UMAP.csv"
+ARTIFACT_DIR = "artifacts"
+DEFAULT_KS = (8, 16, 32)
+DENSITY_COL = "cluster_density"
+
+
+def kmeans_col(k):
+    return f"cluster_k{k}"
+
+
+def cluster_path(version, root=ARTIFACT_DIR):
+    return os.path.join(root, version, "clusters.csv")
+
+
+def load_clusters(version, root=ARTIFACT_DIR):
+    """Cluster labels per verb for a dataset version, or None if not built yet."""
+    path = cluster_path(version, root)
+    return pd.read_csv(path) if version and os.path.exists(path) else None
+
+
+def cluster_columns(clusters):
+    """Label columns of a clusters table, k-means runs first in increasing k."""
+    if clusters is None:
+        return []
+    km = sorted((c for c in clusters.columns if c.startswith("cluster_k")), key=lambda c: int(c[len("cluster_k"):]))
+    return km + ([DENSITY_COL] if DENSITY_COL in clusters.columns else [])
+
+
+def minibatch_kmeans(X, k, batch_size=1024, n_iter=200, seed=0):
+    """
+    Mini-batch k-means (Sculley 2010) with k-means++ seeding on a sample.
+    Each batch moves a centre towards the mean of its assigned points with a
+    per-centre learning rate of 1 / points seen. Returns ``(labels, centers)``.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(X)
+    k = min(int(k), n)
+    sample = X[rng.choice(n, size=min(n, 20 * k + batch_size), replace=False)]
+
+    centers = [sample[rng.integers(len(sample))]]
+    closest = ((sample - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        nxt = sample[rng.choice(len(sample), p=closest / closest.sum())] if closest.sum() > 0 else sample[rng.integers(len(sample))]
+        centers.append(nxt)
+        closest = np.minimum(closest, ((sample - nxt) ** 2).sum(axis=1))
+    centers = np.array(centers, dtype=float)
+
+    seen = np.zeros(k)
+    for _ in range(n_iter):
+        batch = X[rng.integers(0, n, size=min(batch_size, n))]
+        _, assign = cKDTree(centers).query(batch)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, assign, batch)
+        hit = counts > 0
+        seen[hit] += counts[hit]
+        eta = (counts[hit] / seen[hit])[:, None]
+        centers[hit] = (1 - eta) * centers[hit] + eta * (sums[hit] / counts[hit][:, None])
+
+    _, labels = cKDTree(centers).query(X)
+    return _by_size(labels), centers
+
+
+def density_clusters(X, min_samples=10, eps=None):
+    """
+    DBSCAN-style density clusters. A point is a core point when its
+    ``min_samples``-th neighbour lies within ``eps`` (by default the median
+    of those core distances, in the spirit of HDBSCAN's core distance).
+    Core points within ``eps`` of each other are connected, and border
+    points join their nearest core point. Noise is labelled -1.
+    """
+    n = len(X)
+    tree = cKDTree(X)
+    kd, _ = tree.query(X, k=min(min_samples, n))
+    core_dist = kd.reshape(n, -1)[:, -1]
+    eps = float(np.median(core_dist)) if eps is None else eps
+    core = np.flatnonzero(core_dist <= eps)
+    labels = np.full(n, -1, dtype=np.int64)
+    if len(core) == 0:
+        return labels
+
+    core_tree = cKDTree(X[core])
+    pairs = core_tree.query_pairs(eps, output_type="ndarray")
+    graph = coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(len(core), len(core)))
+    _, comp = connected_components(graph, directed=False)
+    labels[core] = comp
+
+    border = np.setdiff1d(np.arange(n), core)
+    if len(border):
+        dist, near = core_tree.query(X[border])
+        ok = dist <= eps
+        labels[border[ok]] = comp[near[ok]]
+    return _by_size(labels)
+
+
+def _by_size(labels):
+    """Relabel clusters 0, 1, ... by decreasing size, keeping -1 for noise."""
+    labels = np.asarray(labels, dtype=np.int64)
+    valid = labels >= 0
+    if not valid.any():
+        return labels
+    counts = np.bincount(labels[valid])
+    rank = np.empty(len(counts), dtype=np.int64)
+    rank[np.argsort(-counts, kind="stable")] = np.arange(len(counts))
+    out = labels.copy()
+    out[valid] = rank[labels[valid]]
+    return out
+
+
+def build_clusters(df, ks=DEFAULT_KS, min_samples=10, seed=0):
+    """One row per verb with a label column per k-means run plus the density clusters."""
+    verb_col = "Verb" if "Verb" in df.columns else "Chinese_Verbs"
+    emb = embedding_cols(df)
+    cols = emb or UMAP_COLS
+    verbs = df.dropna(subset=cols).drop_duplicates(subset=[verb_col])
+    X = verbs[cols].to_numpy(dtype=float)
+    if emb:
+        X = X / np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-12)
+
+    out = pd.DataFrame({"Verb": verbs[verb_col].to_numpy()})
+    for k in ks:
+        out[kmeans_col(k)] = minibatch_kmeans(X, k, seed=seed)[0]
+    out[DENSITY_COL] = density_clusters(X, min_samples=min_samples)
+    return out
+
+
+def adjusted_rand_index(a, b):
+    """Agreement between two labelings (1 = identical partitions, ~0 = chance)."""
+    table = pd.crosstab(np.asarray(a), np.asarray(b)).to_numpy()
+    comb = lambda x: x * (x - 1) / 2
+    n = table.sum()
+    index = comb(table).sum()
+    rows, cols = comb(table.sum(axis=1)).sum(), comb(table.sum(axis=0)).sum()
+    expected = rows * cols / comb(n) if n > 1 else 0
+    top = (rows + cols) / 2
+    return float((index - expected) / (top - expected)) if top != expected else 1.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute semantic clusters for a dataset version.")
+    parser.add_argument("--data", default=DEFAULT_DATA, help="verbs snapshot (CSV or Parquet)")
+    parser.add_argument("--ks", default=",".join(map(str, DEFAULT_KS)), help="comma-separated k values")
+    parser.add_argument("--min-samples", type=int, default=10, help="density clusters: neighbours for a core point")
+    parser.add_argument("--out-dir", default=ARTIFACT_DIR, help="artifact root")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    df = read_verbs(args.data)
+    ks = [int(k) for k in args.ks.split(",") if k.strip()]
+    clusters = build_clusters(df, ks, args.min_samples)
+    path = cluster_path(df.attrs["version"], args.out_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    clusters.to_csv(path, index=False)
+    print(f"Clustered {len(clusters)} verbs in {time.perf_counter() - t0:.1f}s -> {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# coach_views.py
+"""
+Verb Action Coach builders: the per-version rows, edge table, frequency
+tables, count cubes and deck indexes, and the coverage orders. The page
+reads them; ``warmup`` calls them with the page's default settings.
+
+Coverage results are keyed by dataset version, weighting ("uniform" or
+"freq"), class filter (a filter_key) and known characters; the edge table
+and pair frequencies are read from the tables published for the version.
+The unfiltered greedy orders come from the analytics bundle when built.
+"""
+import streamlit as st
+
+import analytics
+from bitmap import BitmapIndex
+from compute_cache import computed, publish, report, table
+from coverage import CoverageEngine
+from dataset import class_names, option_lists, prepare_coach
+from deck_sampling import edge_frequency, frequency_weights
+from phonetic_query import QUERY_FIELDS
+
+# Weighting the coverage optimizer starts with
+DEFAULT_WEIGHTING = "uniform"
+
+
+@st.cache_resource
+def coach_tables(version, _raw):
+    """Prepared rows and edge table, once per dataset version (read-only)."""
+    return prepare_coach(_raw.copy())
+
+
+@computed
+def class_labels(version, lang):
+    """Class code → name in ``lang``."""
+    return class_names(table(version, "coach_rows"), lang)
+
+
+@computed
+def coverage_weights(version, weighting, where):
+    """Edge weights: verb frequency in the raw table or uniform, zero outside the class filter."""
+    mask = table(version, "coverage_bitmap").mask(dict(where)) if where else None
+    return analytics.coverage_weights(table(version, "coverage_edges"), table(version, "pair_freq"), weighting, mask)
+
+
+@computed(name="coach.greedy_coverage")
+def greedy_coverage(version, weighting, where, known=()):
+    """
+    Full greedy pick order for the coverage edges, computed once per dataset,
+    weighting, class filter and known-character seed. Greedy cover is
+    prefix-consistent, so any k is a slice of this result.
+    """
+    return analytics.greedy_coverage(table(version, "coverage_edges"), coverage_weights(version, weighting, where), known)
+
+
+@computed(persist=lambda res: res["optimal"])
+def exact_coverage(version, weighting, where, known, k, time_limit):
+    """
+    Branch-and-bound optimum for k picks, seeded with the greedy prefix. Only
+    proven optima go to disk; a search cut off by the time limit stays in this
+    process's memory and is searched again after a restart.
+    """
+    edges = table(version, "coverage_edges")
+    engine = CoverageEngine(edges["char1"], edges["char2"], coverage_weights(version, weighting, where))
+    known_codes = engine.codes(known)
+    order, _, _ = greedy_coverage(version, weighting, where, known)
+    res = engine.exact(k, known=known_codes, time_limit=time_limit, incumbent=engine.codes(order[:k]), progress=report)
+    res["picks"] = engine.chars[res["picks"]].tolist()
+    return res
+
+
+@st.cache_resource
+def frequency_tables(version, _df, _edge_df):
+    """
+    Verb frequency per (char1, char2) and aligned with edge_df rows, built once
+    per dataset version. Shared read-only: callers must not mutate the results.
+    """
+    freq = edge_frequency(_df)
+    return freq, frequency_weights(_edge_df, freq)
+
+
+@computed(name="coach.count_cubes")
+def count_cubes(version):
+    """Count cubes for the overview bars and the tone heatmap, once per dataset version."""
+    return analytics.count_cubes(table(version, "coach_rows"), table(version, "coach_edges"))
+
+
+@st.cache_resource
+def coverage_tables(version, _edge_df):
+    """One edge per distinct verb for the coverage optimizer and its class bitsets, once per dataset version."""
+    return analytics.coverage_edges(_edge_df)
+
+
+@st.cache_resource
+def deck_bitmap(version, _edge_df):
+    """Per-value bitsets over the tone and phonetic columns of edge_df, once per dataset version."""
+    return BitmapIndex(_edge_df, [c for c in QUERY_FIELDS if c in _edge_df.columns])
+
+
+@st.cache_data
+def deck_options(version, _edge_df):
+    """Option lists for the widgets, once per dataset version."""
+    return option_lists(_edge_df)
+
+
+def publish_tables(version, raw):
+    """Prepare and publish the rows, edges and pair frequencies; returns ``(rows, edges)``."""
+    df, edge_df = coach_tables(version, raw)
+    publish(version, "coach_rows", df)
+    publish(version, "coach_edges", edge_df)
+    publish(version, "pair_freq", frequency_tables(version, df, edge_df)[0])
+    return df, edge_df
+
+
+def publish_coverage(version, edge_df):
+    """Prepare and publish the coverage edges and their class bitsets; returns the edges."""
+    edges, cov_bitmap = coverage_tables(version, edge_df)
+    publish(version, "coverage_edges", edges)
+    publish(version, "coverage_bitmap", cov_bitmap)
+    return edges
+
+
+def warm(version, raw, langs):
+    """Build the page's tables, cubes and the default greedy cover, and its class names in each of ``langs``."""
+    df, edge_df = publish_tables(version, raw)
+    for lang in langs:
+        class_labels(version, lang)
+    count_cubes(version)
+    deck_bitmap(version, edge_df)
+    deck_options(version, edge_df)
+    if not edge_df.empty:
+        publish_coverage(version, edge_df)
+        greedy_coverage(version, DEFAULT_WEIGHTING, (), ())
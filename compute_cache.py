@@ -0,0 +1,289 @@
+# compute_cache.py
+"""
+Derived results keyed by (dataset version, filter key, function name).
+
+Graphs, communities, coverage orders and the like depend on the dataset and
+a few filter values, never on the session. A ``computed`` function takes the
+dataset version plus small hashable arguments (use ``filter_key`` for
+``{column: values}`` filters) and reads its tables by name from ``table``;
+pages ``publish`` those tables once per version. A lookup hashes a short
+tuple, so a hit costs the same however large the tables are, and never
+touches the data.
+
+Results computed offline (see ``bundle.py``) are ``preload``-ed under the
+same keys and are never evicted.
+
+Each key is computed once at a time: callers asking for a key that is
+already being computed (in any session) wait for that computation instead
+of starting their own. ``fn.submit(version, *args)`` runs the computation on
+a background thread pool and returns a ``Job`` at once, so a page can show
+progress (reported by the computation through ``report``) and pick the
+result up when it is done.
+
+Below the in-memory results sits a shared store on disk (``disk_cache``):
+a computation first looks there, and its result is written back, so app
+processes on the same host reuse each other's work and a restart keeps it.
+Disk keys also carry ``CACHE_FORMAT``, a digest of the app's modules and the
+versions of the libraries results are built with, so a deploy that changes
+any of them starts from fresh entries. ``persist`` keeps cheap or
+provisional results out of the store.
+"""
+import functools
+import glob
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from importlib import metadata
+
+import numpy as np
+
+from disk_cache import MISSING, DiskCache, key_digest
+
+# Results kept in memory, least recently used evicted first
+MAX_ENTRIES = 256
+# Threads for submitted computations (shared by all sessions)
+BACKGROUND_WORKERS = 2
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Shared on-disk store (None disables it) and its size bound; CACHE_DIR moves it
+DISK_PATH = os.path.join(os.environ.get("CACHE_DIR") or os.path.join(APP_DIR, "artifacts"), "compute_cache.sqlite")
+DISK_MAX_BYTES = 512 * 1024 ** 2
+# Bump when stored results change meaning without a code change
+CACHE_FORMAT = 1
+# Libraries whose version can change a stored result
+RESULT_LIBRARIES = ("networkx", "numpy", "pandas", "pyvis", "scipy")
+
+_tables = {}
+_results = OrderedDict()
+_pinned = {}
+_running = {}
+_lock = threading.Lock()
+_local = threading.local()
+_pool = None
+_disk = None
+_code_version = None
+
+
+class Job(Future):
+    """
+    A computation queued, running or done. ``progress`` is the fraction done
+    as last reported by the computation (None if it does not report).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.progress = None
+        self.started = time.monotonic()
+        self.claimed = False
+
+
+def _done(result):
+    job = Job()
+    job.claimed = True
+    job.progress = 1.0
+    job.set_result(result)
+    return job
+
+
+def report(fraction):
+    """Report the progress (0..1) of the computation running on this thread; a no-op elsewhere."""
+    job = getattr(_local, "job", None)
+    if job is not None:
+        job.progress = min(max(float(fraction), 0.0), 1.0)
+
+
+def running():
+    """Jobs queued or in progress."""
+    with _lock:
+        return list(_running.values())
+
+
+def _store():
+    global _disk
+    with _lock:
+        if _disk is None and DISK_PATH:
+            _disk = DiskCache(DISK_PATH, DISK_MAX_BYTES)
+        return _disk
+
+
+def _disk_get(key):
+    store = _store()
+    if store is None:
+        return MISSING
+    try:
+        return store.get(key)
+    except Exception:
+        # Locked too long, unreadable or pickled by other library versions: compute instead
+        return MISSING
+
+
+def _disk_put(key, name, version, result):
+    store = _store()
+    if store is not None:
+        try:
+            store.put(key, name, str(version), result)
+        except (sqlite3.Error, OSError):
+            pass
+
+
+def _library_version(name):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def code_version():
+    """Digest of the app's modules and result libraries' versions; part of every disk key."""
+    global _code_version
+    if _code_version is None:
+        h = hashlib.sha256(repr((CACHE_FORMAT, [(lib, _library_version(lib)) for lib in RESULT_LIBRARIES])).encode())
+        for path in sorted(glob.glob(os.path.join(APP_DIR, "*.py"))):
+            with open(path, "rb") as f:
+                h.update(os.path.basename(path).encode() + b"\0" + f.read())
+        _code_version = h.hexdigest()
+    return _code_version
+
+
+def publish(version, name, value):
+    """Make a prepared table (or index) of dataset ``version`` available to computed functions."""
+    _tables[(version, name)] = value
+    return value
+
+
+def table(version, name):
+    """A table published for ``version``; computed functions must not mutate it."""
+    try:
+        return _tables[(version, name)]
+    except KeyError:
+        raise KeyError(f"table '{name}' was not published for dataset version '{version}'") from None
+
+
+def _scalar(v):
+    return v.item() if isinstance(v, np.generic) else v
+
+
+def filter_key(where=None):
+    """
+    Hashable, order-free form of a ``{column: allowed values}`` filter:
+    columns sorted, values deduplicated and sorted. ``None`` (no filter)
+    and ``{}`` give the same key.
+    """
+    out = []
+    for col, values in sorted((where or {}).items()):
+        values = [values] if isinstance(values, (str, bytes)) or np.ndim(values) == 0 else values
+        values = {_scalar(v) for v in values}
+        out.append((col, tuple(sorted(values, key=lambda v: (type(v).__name__, v)))))
+    return tuple(out)
+
+
+def computed(fn=None, *, name=None, persist=True):
+    """
+    Memoise ``fn(version, *keys)`` on its name and its (small, hashable)
+    arguments. Results are shared by every session and must be treated as
+    read-only. ``name`` defaults to the file and function name; give one
+    explicitly when results are preloaded from a bundle. ``persist`` is
+    False for results not worth storing on disk, or a predicate on the
+    result telling whether this one may be. The wrapper's ``submit`` starts
+    the same computation in the background.
+    """
+    if fn is None:
+        return functools.partial(computed, name=name, persist=persist)
+    # Page scripts all run as __main__, so the file name tells their functions apart
+    name = name or f"{os.path.basename(fn.__code__.co_filename)}:{fn.__qualname__}"
+
+    def cached(key):
+        # Under _lock
+        if key in _pinned:
+            return _pinned[key]
+        if key in _results:
+            _results.move_to_end(key)
+            return _results[key]
+        return MISSING
+
+    def compute(key, job, version, args, kwargs):
+        outer, _local.job = getattr(_local, "job", None), job
+        job.started = time.monotonic()
+        stored = key_digest((code_version(), key)) if persist else None
+        try:
+            result = _disk_get(stored) if stored else MISSING
+            if result is MISSING:
+                result = fn(version, *args, **kwargs)
+                if stored and (persist is True or persist(result)):
+                    _disk_put(stored, name, version, result)
+        except BaseException as e:
+            with _lock:
+                _running.pop(key, None)
+            job.set_exception(e)
+            raise
+        finally:
+            _local.job = outer
+        with _lock:
+            _results[key] = result
+            while len(_results) > MAX_ENTRIES:
+                _results.popitem(last=False)
+            _running.pop(key, None)
+        job.progress = 1.0
+        job.set_result(result)
+        return result
+
+    @functools.wraps(fn)
+    def wrapper(version, *args, **kwargs):
+        key = (name, version, args, tuple(sorted(kwargs.items())))
+        with _lock:
+            result = cached(key)
+            if result is not MISSING:
+                return result
+            job = _running.setdefault(key, Job())
+            # A submitted job that no worker has started yet is run here instead
+            mine, job.claimed = not job.claimed, True
+        return compute(key, job, version, args, kwargs) if mine else job.result()
+
+    def start(key, job, version, args, kwargs):
+        with _lock:
+            if job.claimed:
+                return
+            job.claimed = True
+        compute(key, job, version, args, kwargs)
+
+    def submit(version, *args, **kwargs):
+        """Compute in the background unless cached or already running; returns the ``Job``."""
+        global _pool
+        key = (name, version, args, tuple(sorted(kwargs.items())))
+        with _lock:
+            result = cached(key)
+            if result is not MISSING:
+                return _done(result)
+            if key in _running:
+                return _running[key]
+            job = _running[key] = Job()
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="compute")
+        _pool.submit(start, key, job, version, args, kwargs)
+        return job
+
+    wrapper.cache_name = name
+    wrapper.submit = submit
+    return wrapper
+
+
+def preload(name, version, args, result):
+    """Serve ``result`` for ``name(version, *args)`` without computing it."""
+    with _lock:
+        _pinned[(name, version, tuple(args), ())] = result
+
+
+def clear(version=None):
+    """Drop cached results, on disk too, and tables (of one dataset version, or all)."""
+    with _lock:
+        for cache in (_results, _pinned):
+            for key in [k for k in cache if version is None or k[1] == version]:
+                del cache[key]
+        for key in [k for k in _tables if version is None or k[0] == version]:
+            del _tables[key]
+    store = _store()
+    if store is not None:
+        store.clear(version)
@@ -0,0 +1,238 @@
+# coverage.py
+import heapq
+import time
+
+import numpy as np
+import pandas as pd
+
+# edge_rank marker for edges already covered by the learner's known characters
+KNOWN = -2
+# Gains at or below this are zero left over from subtracting float weights
+GAIN_EPS = 1e-12
+
+
+class CoverageEngine:
+    """
+    Greedy character cover over a verb edge list (char1 → char2).
+
+    Characters are factorized into a compact integer index and every edge
+    contributes two incidence slots (``2*e`` for char1, ``2*e + 1`` for char2).
+    Slots are grouped per character, so picking a character only touches the
+    edges incident to it instead of rescanning the whole table.
+
+    ``weights`` (one per edge, default 1) turns the objective into weighted
+    coverage, e.g. verb frequency or 0/1 for a class restriction. A self-loop
+    edge (char1 == char2) counts once toward its character's gain, as in the
+    objective, except with unit weights: there it counts twice, which keeps
+    the original unweighted selection order.
+    """
+
+    def __init__(self, char1, char2, weights=None):
+        char1 = pd.Series(char1).reset_index(drop=True)
+        char2 = pd.Series(char2).reset_index(drop=True)
+        codes, chars = pd.factorize(pd.concat([char1, char2], ignore_index=True))
+        m = len(char1)
+
+        self.chars = np.asarray(chars, dtype=object)
+        self.char_index = {ch: i for i, ch in enumerate(self.chars)}
+        self.src = codes[:m].astype(np.int64)
+        self.dst = codes[m:].astype(np.int64)
+        self.weights = np.ones(m) if weights is None else np.asarray(weights, dtype=float)
+
+        slot_char = np.empty(2 * m, dtype=np.int64)
+        slot_char[0::2] = self.src
+        slot_char[1::2] = self.dst
+        # Stable sort keeps each character's slots in table order
+        self._slots = np.argsort(slot_char, kind="stable")
+        self._degree = np.bincount(slot_char, minlength=len(self.chars))
+        self._indptr = np.concatenate([[0], np.cumsum(self._degree)])
+        slot_weight = np.repeat(self.weights, 2)
+        if not (self.weights == 1).all():
+            slot_weight[1::2][self.src == self.dst] = 0
+        self._slot_char = slot_char
+        self._slot_weight = slot_weight
+        self._gain = np.bincount(slot_char, weights=slot_weight, minlength=len(self.chars))
+
+    @property
+    def n_edges(self):
+        return len(self.src)
+
+    def codes(self, chars):
+        """Map characters to engine codes, silently dropping unknown ones."""
+        return [self.char_index[ch] for ch in dict.fromkeys(chars) if ch in self.char_index]
+
+    def known_mask(self, known=()):
+        """Boolean mask of edges touching any of the ``known`` character codes."""
+        is_known = np.zeros(len(self.chars), dtype=bool)
+        is_known[list(known)] = True
+        return is_known[self.src] | is_known[self.dst]
+
+    def objective(self, picks, known=()):
+        """Total weight of edges covered by ``picks`` plus the ``known`` seed set."""
+        covered = self.known_mask(list(known) + list(picks))
+        return float(self.weights[covered].sum())
+
+    def greedy(self, k=None, known=()):
+        """
+        Run lazy greedy set cover for up to ``k`` picks (all useful picks if None).
+
+        ``known`` holds character codes the learner already knows: their edges
+        start out covered and they are never picked.
+
+        Returns ``(picks, edge_rank)``: character codes in pick order, and for
+        every edge the index of the pick that first covered it (-1 if
+        uncovered, ``KNOWN`` if covered by the seed set).
+
+        Ties on gain are broken by the earliest uncovered slot in table order,
+        which reproduces the original dict-based scan exactly with unit
+        weights (see the class docstring for self-loops).
+        """
+        n = len(self.chars)
+        slot_char = self._slot_char.tolist()
+        slot_weight = self._slot_weight.tolist()
+        slots = self._slots.tolist()
+        indptr = self._indptr.tolist()
+        left = self._degree.tolist()
+        gain = self._gain.tolist()
+        ptr = indptr[:-1]
+        edge_rank = [-1] * self.n_edges
+
+        def cover(e, rank):
+            edge_rank[e] = rank
+            for s in (2 * e, 2 * e + 1):
+                left[slot_char[s]] -= 1
+                gain[slot_char[s]] -= slot_weight[s]
+
+        known = set(known)
+        for e in np.flatnonzero(self.known_mask(known)).tolist():
+            cover(e, KNOWN)
+
+        heap = [(-gain[c], slots[indptr[c]], c) for c in range(n) if left[c] and c not in known]
+        heapq.heapify(heap)
+
+        picks = []
+        while heap and (k is None or len(picks) < k):
+            neg, pos, c = heapq.heappop(heap)
+            if left[c] == 0:
+                continue
+            p = ptr[c]
+            while edge_rank[slots[p] >> 1] != -1:
+                p += 1
+            ptr[c] = p
+            if neg != -gain[c] or pos != slots[p]:
+                # Stale entry: its key can only have worsened, so requeue it
+                heapq.heappush(heap, (-gain[c], slots[p], c))
+                continue
+            if gain[c] <= GAIN_EPS:
+                # Best remaining gain is zero (only zero-weight edges left, up to rounding)
+                break
+
+            rank = len(picks)
+            picks.append(c)
+            for s in slots[p:indptr[c + 1]]:
+                if edge_rank[s >> 1] == -1:
+                    cover(s >> 1, rank)
+
+        return np.asarray(picks, dtype=np.int64), np.asarray(edge_rank, dtype=np.int64)
+
+    def exact(self, k, known=(), time_limit=2.0, incumbent=None, progress=None):
+        """
+        Branch-and-bound maximum weighted coverage with exactly ``k`` picks.
+
+        Meant for small k. The bound at each node is the covered weight plus
+        the ``r`` largest marginal gains among remaining candidates, which is
+        valid because coverage is submodular. ``incumbent`` (e.g. the greedy
+        picks) seeds the best known solution. ``progress(fraction)``, if given,
+        is called with the share of the time limit used so far.
+
+        Returns a dict with ``picks``, ``value``, ``bound`` (a proven upper
+        bound on the optimum) and ``optimal`` (False if the time limit hit).
+        """
+        known = list(known)
+        deadline = time.perf_counter() + time_limit
+        w = self.weights
+        loop = self.src == self.dst
+
+        def gains(uncovered):
+            wu = w * uncovered
+            return (np.bincount(self.src, weights=wu, minlength=len(self.chars))
+                    + np.bincount(self.dst, weights=wu * ~loop, minlength=len(self.chars)))
+
+        base = ~self.known_mask(known)
+        g0 = gains(base)
+        g0[known] = 0
+        # Candidates in descending initial gain; branch only on useful chars
+        cand = np.argsort(-g0, kind="stable")
+        cand = cand[g0[cand] > 0]
+        total = float(w.sum())
+
+        best = {"picks": [], "value": self.objective([], known)}
+        if incumbent is not None:
+            best = {"picks": list(incumbent), "value": self.objective(incumbent, known)}
+        state = {"timed_out": False, "open_bound": -np.inf}
+
+        def search(start, chosen, uncovered, covered_w):
+            r = k - len(chosen)
+            if covered_w > best["value"]:
+                best.update(picks=list(chosen), value=covered_w)
+            if r == 0 or start >= len(cand):
+                return
+            rest = cand[start:]
+            g = gains(uncovered)[rest]
+            top = np.sort(g)[::-1][:r]
+            bound = min(covered_w + float(top.sum()), total)
+            if bound <= best["value"] + 1e-9:
+                return
+            if progress is not None:
+                progress(1 - (deadline - time.perf_counter()) / time_limit)
+            if state["timed_out"] or time.perf_counter() > deadline:
+                state["timed_out"] = True
+                state["open_bound"] = max(state["open_bound"], bound)
+                return
+            # Explore the most promising children first; once a child's gain plus
+            # the r-1 best remaining gains cannot beat the incumbent, none can
+            tail = float(top[:r - 1].sum())
+            for j in np.argsort(-g, kind="stable"):
+                if g[j] <= 0 or covered_w + float(g[j]) + tail <= best["value"] + 1e-9:
+                    break
+                if time.perf_counter() > deadline:
+                    state["timed_out"] = True
+                    state["open_bound"] = max(state["open_bound"], bound)
+                    return
+                c = rest[j]
+                touched = (self.src == c) | (self.dst == c)
+                search_from = start + j + 1
+                search_uncovered = uncovered & ~touched
+                chosen.append(c)
+                search(search_from, chosen, search_uncovered, covered_w + float(g[j]))
+                chosen.pop()
+                if state["timed_out"]:
+                    state["open_bound"] = max(state["open_bound"], bound)
+                    return
+
+        search(0, [], base, self.objective([], known))
+        bound = max(best["value"], state["open_bound"]) if state["timed_out"] else best["value"]
+        return {
+            "picks": np.asarray(best["picks"], dtype=np.int64),
+            "value": best["value"],
+            "bound": bound,
+            "optimal": not state["timed_out"],
+        }
+
+
+def coverage_curve(picks, edge_rank, weights=None):
+    """
+    Cumulative covered weight after each pick (``curve[k-1]`` for k picks),
+    including the weight already covered by known characters.
+    """
+    weights = np.ones(len(edge_rank)) if weights is None else np.asarray(weights, dtype=float)
+    picked = edge_rank >= 0
+    newly = np.bincount(edge_rank[picked], weights=weights[picked], minlength=len(picks))
+    return weights[edge_rank == KNOWN].sum() + np.cumsum(newly)
+
+
+def optimality_gap(greedy_value, bound):
+    """Relative gap between a greedy value and an upper bound on the optimum."""
+    if bound <= 0:
+        return 0.0
+    return max(0.0, (bound - greedy_value) / bound)
@@ -0,0 +1,79 @@
+# cube.py
+import numpy as np
+import pandas as pd
+
+
+class CountCube:
+    """
+    Dense count cube over a few categorical columns of a table.
+
+    Every dimension gets a sorted label list plus one trailing slot for
+    missing values, and ``counts`` holds the (optionally weighted) number of
+    rows for every label combination. Charts then come from slices and sums
+    of this array, whose size depends only on the number of labels, so any
+    filter combination costs the same however many rows the table has.
+    """
+
+    def __init__(self, frame: pd.DataFrame, dims, weight=None):
+        self.dims = list(dims)
+        self.labels = {}
+        self.index = {}
+        codes, shape = [], []
+        for d in self.dims:
+            c, uniques = pd.factorize(frame[d], sort=True)
+            c = np.where(c < 0, len(uniques), c)  # missing values go to the last slot
+            self.labels[d] = list(uniques)
+            self.index[d] = {v: i for i, v in enumerate(uniques)}
+            codes.append(c)
+            shape.append(len(uniques) + 1)
+        flat = np.ravel_multi_index(codes, shape) if len(frame) else np.empty(0, dtype=np.int64)
+        w = None if weight is None else frame[weight].to_numpy(dtype=float)
+        counts = np.bincount(flat, weights=w, minlength=int(np.prod(shape)))
+        self.counts = counts.reshape(shape) if weight is not None else counts.astype(np.int64).reshape(shape)
+
+    @classmethod
+    def from_counts(cls, dims, labels, counts):
+        """A cube restored from its dimensions, label lists and counts array (as saved by ``bundle``)."""
+        cube = cls.__new__(cls)
+        cube.dims = list(dims)
+        cube.labels = {d: list(labels[d]) for d in cube.dims}
+        cube.index = {d: {v: i for i, v in enumerate(cube.labels[d])} for d in cube.dims}
+        cube.counts = np.asarray(counts)
+        return cube
+
+    def sum(self, by, where=None):
+        """
+        Totals per label combination of the ``by`` dimensions, over the rows
+        matching ``where`` (``{dim: allowed labels}``; other dimensions are not
+        filtered). The result has one axis per ``by`` dimension, aligned with
+        ``labels[dim]``.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        where = where or {}
+        arr = self.counts
+        for axis, d in enumerate(self.dims):
+            if d in where:
+                keep = np.zeros(arr.shape[axis], dtype=bool)
+                keep[[self.index[d][v] for v in where[d] if v in self.index[d]]] = True
+            else:
+                keep = np.ones(arr.shape[axis], dtype=bool)
+            if d in by:
+                keep[-1] = False  # missing labels are not reported
+                arr = arr * keep.reshape([-1 if a == axis else 1 for a in range(arr.ndim)])
+                arr = np.delete(arr, -1, axis=axis)
+            else:
+                arr = np.compress(keep, arr, axis=axis)
+        other = tuple(a for a, d in enumerate(self.dims) if d not in by)
+        arr = arr.sum(axis=other)
+        kept = [d for d in self.dims if d in by]
+        return np.transpose(arr, [kept.index(d) for d in by])
+
+    def series(self, dim, where=None) -> pd.Series:
+        """1-D totals for ``dim`` as a Series indexed by its labels."""
+        return pd.Series(self.sum([dim], where), index=pd.Index(self.labels[dim], name=dim))
+
+    def frame(self, rows, cols, where=None) -> pd.DataFrame:
+        """2-D totals with ``rows`` labels as the index and ``cols`` labels as columns."""
+        return pd.DataFrame(self.sum([rows, cols], where),
+                            index=pd.Index(self.labels[rows], name=rows),
+                            columns=pd.Index(self.labels[cols], name=cols))
@@ -0,0 +1,234 @@
+# dataset.py
+# Streamlit-free preparation of the verbs table, shared by the pages and the
+# offline/batch tools so both produce identical tables from the same snapshot.
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+CLASSIFICATION_COL = "分类（Classification）"
+# Filters, caches and indexes work on the language-neutral class code; the
+# zh/en names are only used for display.
+CLASS_CODE_COL = "verb_type"
+CLASS_NAME_COLS = {"zh": "Classification_zh", "en": "Classification_en"}
+
+
+def dataset_version(df: pd.DataFrame) -> str:
+    """Short content fingerprint of the verbs table, used to key derived caches."""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha1(row_hashes.tobytes()).hexdigest()[:12]
+
+
+def read_verbs(path: str) -> pd.DataFrame:
+    """Read a verbs snapshot (CSV or Parquet) and stamp its version."""
+    df = pd.read_parquet(path) if str(path).endswith(".parquet") else pd.read_csv(path)
+    df.attrs["version"] = dataset_version(df)
+    return df
+
+
+# Parse bilingual classification "中文(English)"
+def parse_bilingual(text):
+    if isinstance(text, str) and "(" in text and ")" in text:
+        zh, en = text.split("(", 1)
+        en = en.replace(")", "")
+        return zh.strip(), en.strip()
+    return text, text
+
+
+def add_classes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add ``Classification_zh``/``Classification_en`` from the bilingual label,
+    parsed once per distinct category, and make sure every row has a class
+    code (the raw label when the snapshot has no ``verb_type``).
+    """
+    if CLASSIFICATION_COL not in df.columns:
+        return df
+    labels = df[CLASSIFICATION_COL]
+    parsed = {c: parse_bilingual(c) for c in labels.dropna().unique()}
+    df["Classification_zh"] = labels.map({c: zh for c, (zh, _) in parsed.items()})
+    df["Classification_en"] = labels.map({c: en for c, (_, en) in parsed.items()})
+    if CLASS_CODE_COL not in df.columns:
+        df[CLASS_CODE_COL] = labels
+    return df
+
+
+def class_name_col(lang: str) -> str:
+    return CLASS_NAME_COLS.get(lang, CLASS_NAME_COLS["en"])
+
+
+def class_names(df: pd.DataFrame, lang: str) -> dict:
+    """Class code → display name in ``lang`` (empty if the table has no classes)."""
+    col = class_name_col(lang)
+    if CLASS_CODE_COL not in df.columns or col not in df.columns:
+        return {}
+    pairs = df[[CLASS_CODE_COL, col]].dropna().drop_duplicates(subset=[CLASS_CODE_COL])
+    return dict(zip(pairs[CLASS_CODE_COL], pairs[col]))
+
+
+def split_tone_pair(tp: str):
+    try:
+        a, b = str(tp).split("-")
+        return int(a), int(b)
+    except Exception:
+        return None, None
+
+
+def prepare_verbs(df: pd.DataFrame) -> pd.DataFrame:
+    """Character Network / Explore preparation: class columns and a ``Verb`` column."""
+    return add_classes(df).rename(columns={"Chinese_Verbs": "Verb"})
+
+
+def prepare_coach(df: pd.DataFrame):
+    """
+    Verb Action Coach preparation: bilingual classes and src/dst tones on the
+    raw rows, plus the edge-level table (unique AB with one example row).
+    Returns ``(df, edge_df)``.
+    """
+    if "Chinese_Verbs" in df.columns and "Verb" not in df.columns:
+        df = df.rename(columns={"Chinese_Verbs": "Verb"})
+
+    df = add_classes(df)
+
+    if "tone_pattern" in df.columns:
+        df["tone_pattern"] = df["tone_pattern"].astype(str)
+        df["src_tone"], df["dst_tone"] = zip(*df["tone_pattern"].map(split_tone_pair))
+    else:
+        df["tone_pattern"] = None
+        df["src_tone"] = None
+        df["dst_tone"] = None
+
+    edge_cols = [
+        "char1", "char2", "Verb", "pinyin", "English_Verb", "tone_pattern", "src_tone", "dst_tone",
+        "initial_1", "final_1", "initial_2", "final_2", CLASS_CODE_COL, "Classification_zh", "Classification_en"
+    ]
+    edge_cols = [c for c in edge_cols if c in df.columns]
+    edge_df = df[edge_cols].dropna(subset=["char1", "char2"]).drop_duplicates()
+    return df, edge_df
+
+
+def prepare_tones(df: pd.DataFrame):
+    """
+    Tone Explorer preparation: keeps rows with both characters and tones 1–5,
+    adds ``pinyin_base`` and aggregates an edge table per (AB, tone pair) with
+    a ``weight`` count. Returns ``(df, edge_df)``.
+    """
+    if "Chinese_Verbs" in df.columns and "Verb" not in df.columns:
+        df = df.rename(columns={"Chinese_Verbs": "Verb"})
+
+    df = add_classes(df)
+
+    for col in ["char1", "char2", "tone_pattern", "pinyin"]:
+        if col not in df.columns:
+            df[col] = None
+
+    # Remove rows missing chars or tones
+    src_tone, dst_tone = zip(*df["tone_pattern"].astype(str).map(split_tone_pair))
+    df["src_tone"] = src_tone
+    df["dst_tone"] = dst_tone
+    mask_valid = (df["char1"].notna() & df["char2"].notna()
+                  & df["src_tone"].between(1, 5) & df["dst_tone"].between(1, 5))
+    df = df.loc[mask_valid].copy()
+
+    # Pinyin base (remove 1–5 digits)
+    df["pinyin_base"] = df["pinyin"].astype(str).str.replace(r"[1-5]", "", regex=True)
+
+    # Build aggregated edge table to get weights
+    cls_cols = [c for c in (CLASS_CODE_COL, "Classification_zh", "Classification_en") if c in df.columns]
+    phon_cols = [c for c in ("initial_1", "final_1", "initial_2", "final_2") if c in df.columns]
+    agg_cols = ["char1", "char2", "tone_pattern", "src_tone", "dst_tone", "Verb", "pinyin", "English_Verb"] + phon_cols + cls_cols
+    edge_df = df[agg_cols].copy()
+    edge_df["weight"] = 1
+    edge_df = edge_df.groupby(["char1", "char2", "tone_pattern", "src_tone", "dst_tone"], as_index=False).agg({
+        "weight": "sum",
+        "Verb": "first", "pinyin": "first", "English_Verb": "first",
+        **{c: "first" for c in phon_cols + cls_cols},
+    })
+    return df, edge_df
+
+
+
+class VerbIndex:
+    """
+    Verb → record lookups over a verbs table, built once per dataset version.
+
+    Verbs are coded in sorted order, so a row mask maps straight to the
+    sorted verb options it contains. ``record``/``get`` read the verb's first
+    row from column arrays, ``rows`` returns all of its rows, and ``char_rows``
+    does the same for a character in first (1), second (2) or either position.
+    All positions are row positions in the indexed table.
+    """
+
+    def __init__(self, df: pd.DataFrame, verb_col: str = "Verb"):
+        codes, self.verbs = pd.factorize(df[verb_col], sort=True)
+        self.codes = codes
+        self.verbs = np.asarray(self.verbs, dtype=object)
+        self.verb_pos = {v: i for i, v in enumerate(self.verbs)}
+        valid = np.flatnonzero(codes >= 0)
+        order = valid[np.argsort(codes[valid], kind="stable")]
+        bounds = np.searchsorted(codes[order], np.arange(len(self.verbs) + 1))
+        self._rows, self._bounds = order, bounds
+        self.first = order[bounds[:-1]]
+        self.columns = {c: df[c].to_numpy()[self.first] for c in df.columns}
+        self._chars = {pos: self._group(df[col]) for pos, col in ((1, "char1"), (2, "char2")) if col in df.columns}
+
+    @staticmethod
+    def _group(values):
+        codes, uniques = pd.factorize(values)
+        valid = np.flatnonzero(codes >= 0)
+        order = valid[np.argsort(codes[valid], kind="stable")]
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        return {ch: order[bounds[i]:bounds[i + 1]] for i, ch in enumerate(uniques)}
+
+    def __len__(self):
+        return len(self.verbs)
+
+    def __contains__(self, verb):
+        return verb in self.verb_pos
+
+    def get(self, verb, col, default=None):
+        """Value of ``col`` on the verb's first row."""
+        i = self.verb_pos.get(verb)
+        return default if i is None or col not in self.columns else self.columns[col][i]
+
+    def record(self, verb):
+        """The verb's first row as a dict (None for an unknown verb)."""
+        i = self.verb_pos.get(verb)
+        return None if i is None else {c: values[i] for c, values in self.columns.items()}
+
+    def label(self, verb):
+        """Display label "verb (pinyin)"."""
+        pinyin = self.get(verb, "pinyin")
+        return verb if pinyin is None else f"{verb} ({pinyin})"
+
+    def rows(self, verb):
+        """Positions of every row of ``verb``."""
+        i = self.verb_pos.get(verb)
+        return self._rows[:0] if i is None else self._rows[self._bounds[i]:self._bounds[i + 1]]
+
+    def char_rows(self, char, position=None):
+        """Positions of the rows with ``char`` first (1), second (2) or anywhere (None)."""
+        found = [self._chars[p].get(char, self._rows[:0]) for p in ((position,) if position else self._chars)]
+        return found[0] if len(found) == 1 else np.union1d(*found) if found else self._rows[:0]
+
+    def verbs_in(self, mask=None):
+        """Sorted distinct verbs among the rows selected by a boolean ``mask``."""
+        if mask is None:
+            return self.verbs.tolist()
+        codes = self.codes[np.asarray(mask, dtype=bool)]
+        return self.verbs[np.unique(codes[codes >= 0])].tolist()
+
+
+def option_lists(df: pd.DataFrame, class_col: str = CLASS_CODE_COL):
+    """
+    Sidebar option lists: sorted class codes, tone patterns, verbs and
+    characters. They do not depend on the display language.
+    """
+    def distinct(col):
+        return sorted(df[col].dropna().unique().tolist()) if col in df.columns else []
+    chars = pd.concat([df[c] for c in ("char1", "char2") if c in df.columns]) if "char1" in df.columns else pd.Series(dtype=object)
+    return {
+        "classes": distinct(class_col),
+        "tones": distinct("tone_pattern"),
+        "verbs": distinct("Verb"),
+        "chars": sorted(chars.dropna().unique().tolist()),
+    }
@@ -0,0 +1,115 @@
+# deck_sampling.py
+import numpy as np
+import pandas as pd
+
+from dataset import class_name_col
+
+DEFAULT_SEED = 42
+
+
+def edge_frequency(df):
+    """How often each (char1, char2) pair occurs in the raw verbs table."""
+    return df.groupby(["char1", "char2"]).size()
+
+
+def frequency_weights(edges, freq):
+    """
+    Per-row frequency weight for an edge table (1 where the pair is not in
+    ``freq``), as float32 so ``weighted_sample`` can use it without a copy.
+    """
+    keys = pd.MultiIndex.from_frame(edges[["char1", "char2"]])
+    return freq.reindex(keys).fillna(1).to_numpy(dtype=np.float32)
+
+
+class EdgeIndex:
+    """
+    Integer codes for an edge table, built once per dataset version.
+
+    ``degree_scores`` then gives, for any subset of rows, the summed degree of
+    both endpoints on the graph formed by that subset (distinct char pairs,
+    as ``nx.DiGraph.degree`` counts them) without rebuilding a graph.
+    """
+
+    def __init__(self, edges):
+        pairs = pd.MultiIndex.from_frame(edges[["char1", "char2"]])
+        self.pair, uniq = pd.factorize(pairs)
+        ends = np.concatenate([uniq.get_level_values(0).to_numpy(object), uniq.get_level_values(1).to_numpy(object)])
+        codes, self.chars = pd.factorize(ends)
+        self.pair_src = codes[:len(uniq)]
+        self.pair_dst = codes[len(uniq):]
+
+    def degree_scores(self, rows):
+        """deg(char1) + deg(char2) for each of ``rows`` (positions into the edge table)."""
+        n_chars = len(self.chars)
+        seen = np.zeros(len(self.pair_src), dtype=bool)
+        seen[self.pair[rows]] = True
+        deg = (np.bincount(self.pair_src[seen], minlength=n_chars)
+               + np.bincount(self.pair_dst[seen], minlength=n_chars))
+        pair = self.pair[rows]
+        return deg[self.pair_src[pair]] + deg[self.pair_dst[pair]]
+
+
+def weighted_sample(weights, k, seed=DEFAULT_SEED):
+    """
+    Weighted sampling without replacement (Efraimidis–Spirakis).
+
+    Each item draws an exponential key ``E / w`` and the ``k`` smallest keys
+    win, which is equivalent to successive draws proportional to weight.
+    Returns positions in draw order. Zero-weight items are only drawn once
+    every positive-weight item has been taken.
+    """
+    weights = np.asarray(weights, dtype=np.float32)
+    n = len(weights)
+    k = min(int(k), n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    # In-place float32 ops keep this well under a millisecond for 100k+ items.
+    # keys = log(1 - U) / w = -(E / w), so the k *largest* keys win.
+    keys = np.random.default_rng(seed).random(n, dtype=np.float32)
+    np.subtract(1, keys, out=keys)
+    np.log(keys, out=keys)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(keys, weights, out=keys)
+    zero = weights <= 0
+    if zero.any():
+        keys[zero] = -np.inf
+    top = np.argpartition(keys, n - k)[n - k:] if k < n else np.arange(n)
+    return top[np.argsort(-keys[top], kind="stable")]
+
+
+def coach_deck(edge_df, edge_freq, rows, size=40, seed=DEFAULT_SEED, lang="en"):
+    """
+    Verb Action Coach deck: sample ``size`` of ``rows`` (the positions left
+    by the tone/phonetic query) weighted by verb frequency (``edge_freq`` is
+    aligned with ``edge_df`` rows). Returns the display table, with the
+    classification in ``lang``.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    picked = rows[weighted_sample(edge_freq[rows], size, seed)]
+
+    deck = edge_df.iloc[picked]
+    keep_cols = ["Verb", "pinyin", "English_Verb", "tone_pattern", "char1", "char2"]
+    out = deck[keep_cols].reset_index(drop=True)
+    cls_col = class_name_col(lang)
+    if cls_col in deck.columns:
+        out["Classification"] = deck[cls_col].to_numpy()
+    return out
+
+
+def curriculum_scores(edge_index, rows, weight, by_degree=True):
+    """Tone Explorer sampling score: 1 + log1p(frequency) + 0.5 · endpoint degree."""
+    if not by_degree:
+        return np.ones(len(rows))
+    return 1 + np.log1p(weight[rows]) + 0.5 * edge_index.degree_scores(rows)
+
+
+def curriculum_deck(edge_df, edge_index, rows, by_degree=True, size=40, seed=DEFAULT_SEED):
+    """
+    Tone Explorer curriculum deck drawn from ``rows`` of ``edge_df`` (the
+    filtered candidate pool), grouped by tone pair for display.
+    """
+    weight = edge_df["weight"].to_numpy(dtype=float)
+    scores = curriculum_scores(edge_index, rows, weight, by_degree)
+    picked = rows[weighted_sample(scores, size, seed)]
+    deck = edge_df.iloc[picked][["Verb", "pinyin", "English_Verb", "tone_pattern", "char1", "char2"]]
+    return deck.sort_values(["tone_pattern"], kind="stable").reset_index(drop=True)
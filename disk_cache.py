@@ -0,0 +1,161 @@
+# disk_cache.py
+"""
+Size-bounded result store on disk, shared by every app process on a host.
+
+One SQLite database in WAL mode holds two tables:
+- ``results``: one row per cache key (digest of the compute-cache key),
+  pointing at a blob, with its name, dataset version and last use.
+- ``blobs``: pickled, compressed values, stored under the SHA-256 of their
+  bytes (content-addressed). Keys with equal results share one blob.
+
+When the blobs outgrow ``max_bytes``, the least recently used keys are
+dropped with any blobs no key points at any more. Reads only record a use
+when the last one is older than ``TOUCH_SECONDS``, so cache hits rarely
+write. SQLite handles the locking between processes. Entries survive
+restarts.
+
+Usage (the compute cache's store unless ``--path`` is given):
+  python disk_cache.py stats
+  python disk_cache.py clear [--version <dataset version>]
+"""
+import argparse
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+MISSING = object()
+# Seconds between recorded uses of one entry
+TOUCH_SECONDS = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, size INTEGER NOT NULL, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY, name TEXT NOT NULL, version TEXT NOT NULL,
+    digest TEXT NOT NULL REFERENCES blobs(digest), used REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS results_used ON results(used);
+CREATE INDEX IF NOT EXISTS results_digest ON results(digest);
+"""
+
+# Keys in order of last use, up to the one whose deletion brings the freed bytes to the
+# overshoot. A blob is freed only with its last key (the most recently used one), so
+# only that key counts its size.
+_EVICT = """
+DELETE FROM results WHERE key IN (
+    SELECT key FROM (
+        SELECT key, frees, SUM(frees) OVER (ORDER BY used, key ROWS UNBOUNDED PRECEDING) AS freed FROM (
+            SELECT r.key, r.used,
+                   CASE WHEN ROW_NUMBER() OVER (PARTITION BY r.digest ORDER BY r.used DESC, r.key DESC) = 1
+                        THEN b.size ELSE 0 END AS frees
+            FROM results r JOIN blobs b ON b.digest = r.digest))
+    WHERE freed - frees < ?)
+"""
+_SWEEP = "DELETE FROM blobs WHERE NOT EXISTS (SELECT 1 FROM results r WHERE r.digest = blobs.digest)"
+
+
+def key_digest(key):
+    """Stable digest of a key made of strings, numbers, None and tuples of them."""
+    return hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """Pickled results keyed by digest, evicted least recently used first beyond ``max_bytes``."""
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _db(self):
+        # sqlite3 connections stay in their thread (and process)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        """The value stored under ``key`` (a digest), or ``MISSING``."""
+        db = self._db()
+        row = db.execute("SELECT b.data, r.used FROM results r JOIN blobs b ON b.digest = r.digest WHERE r.key = ?",
+                         (key,)).fetchone()
+        if row is None:
+            return MISSING
+        now = time.time()
+        if now - row[1] > TOUCH_SECONDS:
+            try:
+                db.execute("UPDATE results SET used = ? WHERE key = ?", (now, key))
+            except sqlite3.OperationalError:
+                pass  # another process is writing; the use is recorded on a later hit
+        return pickle.loads(zlib.decompress(row[0]))
+
+    def put(self, key, name, version, value):
+        """Store ``value`` under ``key``; False if it cannot be pickled or is larger than the cache."""
+        try:
+            data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 1)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return False
+        if len(data) > self.max_bytes:
+            return False
+        digest = hashlib.sha256(data).hexdigest()
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("INSERT OR IGNORE INTO blobs (digest, size, data) VALUES (?, ?, ?)", (digest, len(data), data))
+            db.execute("INSERT OR REPLACE INTO results (key, name, version, digest, used) VALUES (?, ?, ?, ?, ?)",
+                       (key, name, version, digest, time.time()))
+            self._evict(db)
+        return True
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total > self.max_bytes:
+            db.execute(_EVICT, (total - self.max_bytes,))
+            db.execute(_SWEEP)
+
+    def clear(self, version=None):
+        """Drop stored results (of one dataset version, or all)."""
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            if version is None:
+                db.execute("DELETE FROM results")
+            else:
+                db.execute("DELETE FROM results WHERE version = ?", (str(version),))
+            db.execute(_SWEEP)
+
+    def stats(self):
+        """Number of keys, of distinct blobs, and their total size in bytes."""
+        db = self._db()
+        keys = db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        blobs, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {"keys": keys, "blobs": blobs, "bytes": size}
+
+
+def main(argv=None):
+    from compute_cache import DISK_MAX_BYTES, DISK_PATH
+
+    parser = argparse.ArgumentParser(description="Inspect or clear the shared on-disk result cache.")
+    parser.add_argument("command", choices=["stats", "clear"])
+    parser.add_argument("--path", default=DISK_PATH, help="cache database")
+    parser.add_argument("--version", help="clear only this dataset version")
+    args = parser.parse_args(argv)
+
+    if not args.path:
+        parser.error("the on-disk cache is disabled (no path)")
+    store = DiskCache(args.path, DISK_MAX_BYTES)
+    if args.command == "clear":
+        store.clear(args.version)
+    s = store.stats()
+    print(f"{args.path}: {s['keys']} keys, {s['blobs']} blobs, {s['bytes'] / 1024 ** 2:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
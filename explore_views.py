@@ -0,0 +1,84 @@
+# explore_views.py
+"""
+Explore Common Verbs builders: the per-version rows, lookup and search
+indexes, filter bitsets, tone-flow cube and semantic map index. The page
+reads them; ``warmup`` calls them once per dataset version.
+"""
+import streamlit as st
+
+from bitmap import BitmapIndex
+from clustering import load_clusters
+from compute_cache import computed, publish, table
+from cube import CountCube
+from dataset import VerbIndex, class_names, option_lists, prepare_verbs
+from search import SearchIndex
+from semantic import SemanticIndex
+
+
+@st.cache_resource
+def prepare_rows(version, _raw):
+    """Rows with class codes/names and a Verb column, once per dataset version (read-only)."""
+    return prepare_verbs(_raw.copy())
+
+
+@computed
+def class_labels(version, lang):
+    """Class code → name in ``lang``."""
+    return class_names(table(version, 'explore_rows'), lang)
+
+
+@st.cache_resource
+def verb_index(version, _df):
+    """Verb → record lookups, once per dataset version."""
+    return VerbIndex(_df)
+
+
+@st.cache_data
+def page_options(version, _df):
+    """Option lists for the widgets, once per dataset version."""
+    return option_lists(_df)
+
+
+@st.cache_resource
+def search_index(version, _df):
+    """Hanzi/pinyin/English search index, once per dataset version."""
+    return SearchIndex(_df)
+
+
+@st.cache_resource
+def filter_bitmap(version, _df):
+    """Per-value row bitsets for the sidebar filters, once per dataset version."""
+    return BitmapIndex(_df, ['verb_type', 'tone_pattern'])
+
+
+@st.cache_resource
+def tone_flow_cube(version, _df):
+    """verb_type × tone_pattern × first/second tone counts, once per dataset version."""
+    return CountCube(_df, ['verb_type', 'tone_pattern', 'first_char_tone', 'second_char_tone'])
+
+
+@st.cache_resource
+def semantic_index(version, _df):
+    """KD-trees over the verb map (and embeddings, if shipped), once per dataset version."""
+    return SemanticIndex(_df)
+
+
+@st.cache_data
+def semantic_clusters(version):
+    """Precomputed cluster labels for this dataset version (None if not built)."""
+    return load_clusters(version)
+
+
+def publish_tables(version, raw):
+    """Prepare and publish the rows ``class_labels`` reads; returns them."""
+    return publish(version, 'explore_rows', prepare_rows(version, raw))
+
+
+def warm(version, raw, langs):
+    """Build the page's indexes and cubes, and its class names in each of ``langs``."""
+    df = publish_tables(version, raw)
+    for lang in langs:
+        class_labels(version, lang)
+    for build in (verb_index, page_options, search_index, filter_bitmap, tone_flow_cube, semantic_index):
+        build(version, df)
+    semantic_clusters(version)
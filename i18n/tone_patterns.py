@@ -34,6 +34,7 @@ TRANSLATIONS = {
         'download_csv': "Download CSV",
         'families_header': "Word Family Explorer (with tone)",
         'families_desc': "Select a community to inspect its tone distribution. Edges are colored by tone pair.",
+        'computing_families': "Detecting character families…",
         'family_select': "Select a Family",
         'family_members': "Family Members",
         'tone_distribution': "Tone-Pair Distribution (this family)",
@@ -44,7 +45,20 @@ TRANSLATIONS = {
         'contrast_src': "Different source tone (first syllable)",
         'contrast_dst': "Different destination tone (second syllable)",
         'minpairs_make': "Find Minimal Pairs",
+        'minpairs_count': "{n} pairs (showing up to 300; download for the full list).",
+        'near_header': "Near-Minimal Pairs",
+        'near_desc': "Same tones, but one or two **initials/finals** differ (e.g. zh/z, an/ang).",
+        'near_missing_cols': "Initial/final columns are not available in this dataset.",
+        'near_distance': "Components that differ (at most)",
+        'near_confusable_only': "Only commonly confused contrasts",
+        'near_verb': "Around one verb",
+        'near_verb_all': "All verbs",
         'charprof_select': "Select Character",
+        'verb_search': "Search verbs (hanzi, pinyin or English)",
+        'verb_search_placeholder': "e.g. 打开, da3kai1, dakai, open",
+        'char_search': "Search characters (hanzi or pinyin)",
+        'char_search_placeholder': "e.g. 打, da3, da",
+        'search_none': "No matches.",
         'charprof_desc': "Tone distribution for this character and all its verbs.",
         'src_count': "As first char",
         'dst_count': "As second char",
@@ -54,6 +68,12 @@ TRANSLATIONS = {
         'show_any_to_dst': "Show *→X verbs",
         'curriculum_desc': "Build a tone-focused deck from the current filters.",
         'deck_size': "Deck size",
+        'deck_seed': "Seed",
+        'deck_query': "Phonetic query (optional)",
+        'deck_query_placeholder': "i1 in zh,ch,sh and f2 endswith ng",
+        'deck_query_help': "Clauses joined by `and`. Fields: i1, f1, i2, f2 (initials/finals), tone, src, dst. "
+                           "Operators: in, not in, startswith, endswith. Values are comma-separated.",
+        'deck_query_error': "Query error: {err}",
         'deck_pairs': "Select tone pairs to include",
         'weighting': "Selection weighting",
         'weight_degree': "Favor high-degree characters",
@@ -102,6 +122,7 @@ TRANSLATIONS = {
         'help_minpairs_body': """
 **Minimal tone-contrast sets** share the same **pinyin letters** (digits removed) but have **different tones**.  
 - Choose a contrast focus (any difference / different source tone / different destination tone).  
+- **Near-minimal pairs** keep the tones but change one or two initials/finals; pick a verb to see only its neighbours.  
 **How to use:**  
 1) Generate pairs → use them for **listening** or **production** drills.  
 2) Export CSV for a quick in-class worksheet.  
@@ -123,6 +144,7 @@ TRANSLATIONS = {
         'help_curriculum_body': """
 **Build a tone-focused deck** from your current filters.  
 - Choose tone pairs and **deck size**; pick weighting (**Uniform** or **Favor high-degree characters**).  
+- Narrow the pool with a **phonetic query**, e.g. `i1 in zh,ch,sh and f2 endswith ng`.  
 **How to use:**  
 1) Set filters on the left (topic/tones).  
 2) Generate a deck and **export CSV** (Anki-friendly).  
@@ -165,6 +187,7 @@ TRANSLATIONS = {
         'download_csv': "下载 CSV",
         'families_header': "词族浏览（含声调）",
         'families_desc': "选择一个社群，查看其声调分布。边按声调模式着色。",
+        'computing_families': "正在识别汉字家族…",
         'family_select': "选择词族",
         'family_members': "词族成员",
         'tone_distribution': "该词族的声调分布",
@@ -175,7 +198,20 @@ TRANSLATIONS = {
         'contrast_src': "首字声调不同",
         'contrast_dst': "尾字声调不同",
         'minpairs_make': "查找对立组",
+        'minpairs_count': "共 {n} 组（最多显示 300 组；下载可获取完整列表）。",
+        'near_header': "近似最小对立组",
+        'near_desc': "声调相同，但有一到两个 **声母/韵母** 不同（如 zh/z、an/ang）。",
+        'near_missing_cols': "当前数据集缺少声母/韵母列。",
+        'near_distance': "最多不同的成分数",
+        'near_confusable_only': "仅显示易混淆的对比",
+        'near_verb': "围绕某个动词",
+        'near_verb_all': "全部动词",
         'charprof_select': "选择汉字",
+        'verb_search': "搜索动词（汉字、拼音或英文）",
+        'verb_search_placeholder': "例如：打开、da3kai1、dakai、open",
+        'char_search': "搜索汉字（汉字或拼音）",
+        'char_search_placeholder': "例如：打、da3、da",
+        'search_none': "没有匹配结果。",
         'charprof_desc': "该汉字的声调分布及其所有相关动词。",
         'src_count': "作首字次数",
         'dst_count': "作尾字次数",
@@ -185,6 +221,12 @@ TRANSLATIONS = {
         'show_any_to_dst': "显示 *→X 动词",
         'curriculum_desc': "基于当前筛选构建声调训练清单。",
         'deck_size': "清单大小",
+        'deck_seed': "随机种子",
+        'deck_query': "语音查询（可选）",
+        'deck_query_placeholder': "i1 in zh,ch,sh and f2 endswith ng",
+        'deck_query_help': "用 `and` 连接多个条件。字段：i1、f1、i2、f2（声母/韵母）、tone、src、dst。"
+                           "运算符：in、not in、startswith、endswith。多个取值用逗号分隔。",
+        'deck_query_error': "查询有误：{err}",
         'deck_pairs': "选择包含的声调模式",
         'weighting': "选择权重",
         'weight_degree': "倾向高连接度汉字",
@@ -231,6 +273,7 @@ TRANSLATIONS = {
         'help_minpairs_body': """
 **“最小对立”** 指 **拼音字母相同**（去掉声调数字），但 **声调不同** 的词组。  
 - 选择对比焦点（任意差异/首字不同/尾字不同）。  
+- **近似最小对立组** 声调相同，只改变一到两个声母/韵母；选择某个动词可只看它的近邻。  
 **使用建议：**  
 1）生成对立组 → 做 **听辨** 或 **跟读** 训练；  
 2）导出 CSV 制作课堂练习。  
@@ -252,6 +295,7 @@ TRANSLATIONS = {
         'help_curriculum_body': """
 **从当前筛选构建一套“声调训练清单”。**  
 - 选择声调模式与 **清单大小**，并设定权重（**倾向高连接度** / **均匀**）。  
+- 可用 **语音查询** 进一步缩小范围，例如 `i1 in zh,ch,sh and f2 endswith ng`。  
 **使用建议：**  
 1）先在左侧设定主题/声调；  
 2）生成清单并 **导出 CSV**（兼容 Anki）。  
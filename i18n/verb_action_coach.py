@@ -59,6 +59,12 @@ TRANSLATIONS = {
 1) Choose **how many characters** you can teach soon.
 2) The optimizer lists the **best characters** and shows **coverage%** of verbs.
 3) Use the covered verbs table as a quick teaching deck.
+
+**Options**
+- **Weighting**: count every verb once, or weight verbs by how often they occur.
+- **Classes**: only count verbs from the selected categories.
+- **Known characters**: paste characters the learner already knows; their verbs start out covered.
+- **Exact optimum** (small k): searches for the best possible set within a time limit and reports the gap to the greedy pick.
 """,
         "cov_header": "Coverage Optimizer",
         "cov_caption": "Pick a small set of characters that covers the most verbs.",
@@ -68,6 +74,27 @@ TRANSLATIONS = {
         "cov_coverage": "Coverage",
         "cov_verbs_covered": "Verbs covered",
         "cov_download": "Download covered verbs (CSV)",
+        "cov_curve_title": "Coverage vs. number of characters",
+        "cov_curve_x": "Characters learned (k)",
+        "cov_curve_y": "Coverage (%)",
+        "cov_weighting": "Weighting",
+        "cov_weight_uniform": "Every verb counts once",
+        "cov_weight_freq": "Weight by verb frequency",
+        "cov_classes": "Only count these categories (empty = all)",
+        "cov_known": "Characters the learner already knows",
+        "cov_known_placeholder": "e.g. 打开看说",
+        "cov_known_caption": "Starting from known characters",
+        "cov_exact": "Compute exact optimum",
+        "cov_time_limit": "Time limit (seconds)",
+        "cov_exact_running": "Searching for the optimal set...",
+        "cov_computing": "Computing the cover for these settings...",
+        "cov_greedy_value": "Greedy coverage",
+        "cov_exact_value": "Best found",
+        "cov_gap": "Optimality gap",
+        "cov_exact_optimal": "Proven optimal: the greedy gap above is exact.",
+        "cov_exact_timeout": "Time limit reached: the optimum is at most {bound}, so the gap is an upper estimate.",
+        "cov_exact_list_prefix": "Better set:",
+        "cov_exact_k_hint": "Exact optimum is available for up to {k} characters.",
 
         # DECK
         "deck_help_title": "What is this? How to use it",
@@ -76,8 +103,9 @@ TRANSLATIONS = {
 
 **How to use**
 1) Choose **tone pairs** and (optionally) **phonetic components**.
-2) Set **deck size** and generate.
-3) Export to CSV for Anki or handouts.
+2) For compound rules, type a **query**, e.g. `i1 in zh,ch,sh and f2 endswith ng and tone in 3-4,2-5`.
+3) Set **deck size** and generate.
+4) Export to CSV for Anki or handouts.
 """,
         "deck_header": "Pronunciation / Deck Builder",
         "deck_tone_pairs": "Tone pairs",
@@ -89,6 +117,12 @@ TRANSLATIONS = {
         "deck_second_final": "2nd: final",
         "deck_components": "Components",
         "deck_size": "Deck size",
+        "deck_seed": "Seed",
+        "deck_query": "Query (optional)",
+        "deck_query_placeholder": "i1 in zh,ch,sh and f2 endswith ng and tone in 3-4,2-5",
+        "deck_query_help": "Clauses joined by `and`. Fields: i1, f1, i2, f2 (initials/finals), tone, src, dst. "
+                           "Operators: in, not in, startswith, endswith. Values are comma-separated.",
+        "deck_query_error": "Query error: {err}",
         "deck_no_items": "No items under current filters.",
         "deck_download": "Download deck (CSV)",
 
@@ -166,6 +200,12 @@ TRANSLATIONS = {
 1）选择你近期可教学的 **汉字数量**；
 2）查看推荐的 **最优汉字** 及 **覆盖率**；
 3）使用被覆盖的动词表作为快速教学清单。
+
+**选项**
+- **权重**：每个动词计一次，或按动词出现频率加权；
+- **类别**：只统计所选类别的动词；
+- **已知汉字**：填入学习者已掌握的汉字，相关动词视为已覆盖；
+- **精确最优**（k 较小时）：在时间限制内搜索最优汉字组合，并报告与贪心结果的差距。
 """,
         "cov_header": "覆盖率优化器",
         "cov_caption": "选择少量汉字覆盖尽可能多的动词。",
@@ -175,6 +215,27 @@ TRANSLATIONS = {
         "cov_coverage": "覆盖率",
         "cov_verbs_covered": "覆盖的动词数量",
         "cov_download": "下载覆盖动词（CSV）",
+        "cov_curve_title": "覆盖率随汉字数量的变化",
+        "cov_curve_x": "已学汉字数（k）",
+        "cov_curve_y": "覆盖率（%）",
+        "cov_weighting": "权重",
+        "cov_weight_uniform": "每个动词计一次",
+        "cov_weight_freq": "按动词频率加权",
+        "cov_classes": "只统计这些类别（留空 = 全部）",
+        "cov_known": "学习者已掌握的汉字",
+        "cov_known_placeholder": "例如：打开看说",
+        "cov_known_caption": "从已知汉字出发",
+        "cov_exact": "计算精确最优解",
+        "cov_time_limit": "时间限制（秒）",
+        "cov_exact_running": "正在搜索最优组合...",
+        "cov_computing": "正在计算当前设置下的覆盖...",
+        "cov_greedy_value": "贪心覆盖",
+        "cov_exact_value": "最优结果",
+        "cov_gap": "最优性差距",
+        "cov_exact_optimal": "已证明最优：上方差距为精确值。",
+        "cov_exact_timeout": "已达时间限制：最优值不超过 {bound}，差距为上界估计。",
+        "cov_exact_list_prefix": "更优组合：",
+        "cov_exact_k_hint": "精确最优解仅适用于不超过 {k} 个汉字。",
 
         # DECK
         "deck_help_title": "这是做什么的？如何使用",
@@ -183,8 +244,9 @@ TRANSLATIONS = {
 
 **使用建议**
 1）选择 **声调模式** 与（可选）**语音成分**；
-2）设定 **清单大小** 并生成；
-3）导出 CSV 用于 Anki 或讲义。
+2）需要组合条件时输入 **查询**，例如 `i1 in zh,ch,sh and f2 endswith ng and tone in 3-4,2-5`；
+3）设定 **清单大小** 并生成；
+4）导出 CSV 用于 Anki 或讲义。
 """,
         "deck_header": "发音/清单生成器",
         "deck_tone_pairs": "声调模式",
@@ -196,6 +258,12 @@ TRANSLATIONS = {
         "deck_second_final": "第二字：韵母",
         "deck_components": "成分",
         "deck_size": "清单大小",
+        "deck_seed": "随机种子",
+        "deck_query": "查询（可选）",
+        "deck_query_placeholder": "i1 in zh,ch,sh and f2 endswith ng and tone in 3-4,2-5",
+        "deck_query_help": "用 `and` 连接多个条件。字段：i1、f1、i2、f2（声母/韵母）、tone、src、dst。"
+                           "运算符：in、not in、startswith、endswith。多个取值用逗号分隔。",
+        "deck_query_error": "查询有误：{err}",
         "deck_no_items": "当前筛选无结果。",
         "deck_download": "下载清单（CSV）",
 
@@ -0,0 +1,160 @@
+# minpairs.py
+from itertools import combinations, permutations
+
+import numpy as np
+import pandas as pd
+
+PAIR_COLS = ["Verb", "pinyin", "tone_pattern", "English_Verb"]
+# Output column names as shown on the Tone Explorer tab
+DISPLAY_NAMES = {"Verb": "Verb", "pinyin": "pinyin", "tone_pattern": "tone", "English_Verb": "Eng"}
+
+
+def minimal_pair_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Every minimal tone-contrast pair in ``df`` (as prepared by
+    ``dataset.prepare_tones``): two verbs with the same
+    ``pinyin_base`` (letters without tone digits) and different tone patterns.
+
+    Each (base, tone pattern) is represented by its first row in ``df``, so a
+    block holds at most one member per tone pattern however many verbs share
+    the base. Pairs come from a self-join on the base, with ``A`` before ``B``
+    in table order, and carry ``src_differs`` / ``dst_differs`` /
+    ``any_differs`` flags plus both sides' tones for filtering.
+    """
+    cols = ["pinyin_base"] + PAIR_COLS + ["src_tone", "dst_tone"]
+    reps = df.drop_duplicates(subset=["pinyin_base", "tone_pattern"])[cols].rename(
+        columns={"src_tone": "src", "dst_tone": "dst"})
+    reps["pos"] = np.arange(len(reps))
+
+    side = reps.drop(columns="pinyin_base")
+    a = reps.rename(columns={c: f"A_{c}" for c in side.columns})
+    b = reps.rename(columns={c: f"B_{c}" for c in side.columns})
+    pairs = a.merge(b, on="pinyin_base")
+    pairs = pairs[pairs["A_pos"] < pairs["B_pos"]]
+    pairs = pairs.sort_values(["pinyin_base", "A_pos", "B_pos"], kind="stable")
+
+    pairs["src_differs"] = pairs["A_src"] != pairs["B_src"]
+    pairs["dst_differs"] = pairs["A_dst"] != pairs["B_dst"]
+    pairs["any_differs"] = pairs["A_tone_pattern"] != pairs["B_tone_pattern"]
+
+    renamed = {f"{s}_{c}": f"{s}_{n}" for s in "AB" for c, n in DISPLAY_NAMES.items()}
+    return pairs.drop(columns=["A_pos", "B_pos"]).rename(columns=renamed).reset_index(drop=True)
+
+
+def filter_minimal_pairs(pairs, tone_pairs, src, dst, contrast="any"):
+    """
+    Pairs whose two members both pass the tone filters, restricted to the
+    contrast (``any``, ``src`` or ``dst``). Returns the display columns.
+    """
+    keep = pairs[f"{contrast}_differs"].to_numpy()
+    for side in "AB":
+        keep = (keep & pairs[f"{side}_tone"].isin(tone_pairs).to_numpy()
+                & pairs[f"{side}_src"].isin(src).to_numpy() & pairs[f"{side}_dst"].isin(dst).to_numpy())
+    cols = ["pinyin_base"] + [f"{s}_{n}" for s in "AB" for n in ("Verb", "pinyin", "tone", "Eng")]
+    return pairs.loc[keep, cols].reset_index(drop=True)
+
+
+# ----------------------------
+# Near-minimal pairs (same tones, one or two syllable components differ)
+# ----------------------------
+COMPONENT_COLS = ["initial_1", "final_1", "initial_2", "final_2"]
+
+# Contrasts learners commonly confuse; used to flag near-minimal pairs
+CONFUSABLE = {frozenset(p) for p in [
+    ("zh", "z"), ("ch", "c"), ("sh", "s"), ("n", "l"), ("r", "l"), ("f", "h"),
+    ("j", "q"), ("j", "zh"), ("q", "ch"), ("x", "sh"), ("b", "p"), ("d", "t"), ("g", "k"),
+    ("an", "ang"), ("en", "eng"), ("in", "ing"), ("ian", "iang"), ("uan", "uang"),
+    ("un", "ong"), ("ü", "u"), ("v", "u"), ("e", "o"),
+]}
+_CONFUSABLE_TEXT = {f"{x}/{y}" for pair in CONFUSABLE for x, y in permutations(pair)}
+
+
+class PhoneticIndex:
+    """
+    Near-minimal pair index over verbs described by their four syllable
+    components (``initial_1``, ``final_1``, ``initial_2``, ``final_2``) and
+    two tones.
+
+    The distance between two verbs is the number of components that differ;
+    verbs are only comparable when both tones match. For every set of ``d``
+    components a blocking key is built from the tones and the *other*
+    components, so two verbs are within distance ``d`` exactly when they
+    share one of those keys. Queries and pair enumeration only look inside
+    the matching blocks instead of scanning all verb pairs.
+    """
+
+    def __init__(self, df, max_distance=2):
+        verbs = df.dropna(subset=["src_tone", "dst_tone"]).drop_duplicates(subset=["Verb"])
+        self.verbs = verbs[["Verb", "pinyin", "tone_pattern", "English_Verb"] + COMPONENT_COLS].reset_index(drop=True)
+        self.max_distance = max_distance
+        self.verb_pos = {v: i for i, v in enumerate(self.verbs["Verb"])}
+
+        comps = self.verbs[COMPONENT_COLS].fillna("").astype(str)
+        self.codes = np.column_stack([pd.factorize(comps[c])[0] for c in COMPONENT_COLS])
+        tones = pd.factorize(verbs["tone_pattern"].astype(str))[0]
+        self._blocks = {}
+        for d in range(1, max_distance + 1):
+            for masked in combinations(range(len(COMPONENT_COLS)), d):
+                kept = [j for j in range(len(COMPONENT_COLS)) if j not in masked]
+                key = pd.MultiIndex.from_arrays([tones] + [self.codes[:, j] for j in kept])
+                key_codes = pd.factorize(key)[0]
+                order = np.argsort(key_codes, kind="stable")
+                self._blocks[masked] = (key_codes, order, key_codes[order])
+
+    def distance(self, i, j):
+        """Number of differing components between verb positions ``i`` and ``j`` (arrays allowed)."""
+        return (self.codes[i] != self.codes[j]).sum(axis=-1)
+
+    def neighbors(self, verb, d=1):
+        """
+        All verbs with the same tones as ``verb`` and at most ``d`` differing
+        components (``verb`` itself excluded), nearest first.
+        """
+        if verb not in self.verb_pos:
+            return self._describe(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        i = self.verb_pos[verb]
+        found = []
+        for masked, (key_codes, order, sorted_keys) in self._blocks_for(d):
+            lo, hi = np.searchsorted(sorted_keys, key_codes[i], side="left"), np.searchsorted(sorted_keys, key_codes[i], side="right")
+            found.append(order[lo:hi])
+        j = np.unique(np.concatenate(found))
+        j = j[j != i]
+        j = j[np.argsort(self.distance(i, j), kind="stable")]
+        return self._describe(np.full(len(j), i), j)
+
+    def near_pairs(self, d=1):
+        """Every unordered verb pair at distance 1..``d`` (same tones), via self-joins within blocks."""
+        found = []
+        for masked, (key_codes, order, sorted_keys) in self._blocks_for(d):
+            block = pd.DataFrame({"key": key_codes, "pos": np.arange(len(key_codes))})
+            sizes = block["key"].map(block["key"].value_counts())
+            block = block[sizes.to_numpy() > 1]
+            joined = block.merge(block, on="key", suffixes=("_a", "_b"))
+            joined = joined[joined["pos_a"] < joined["pos_b"]]
+            found.append(joined[["pos_a", "pos_b"]].to_numpy())
+        pairs = np.unique(np.concatenate(found), axis=0) if found else np.empty((0, 2), dtype=np.int64)
+        i, j = pairs[:, 0], pairs[:, 1]
+        keep = self.distance(i, j) > 0  # identical syllables are homophones, not pairs
+        return self._describe(i[keep], j[keep])
+
+    def _blocks_for(self, d):
+        d = min(int(d), self.max_distance)
+        return [(m, b) for m, b in self._blocks.items() if len(m) == d]
+
+    def _describe(self, i, j):
+        """Pair table for verb positions ``i``/``j``: both verbs, distance and the differing components."""
+        a, b = self.verbs.iloc[i].reset_index(drop=True), self.verbs.iloc[j].reset_index(drop=True)
+        differs = pd.Series("", index=a.index)
+        confusable = pd.Series(True, index=a.index)
+        for k, col in enumerate(COMPONENT_COLS):
+            changed = self.codes[i, k] != self.codes[j, k]
+            piece = a[col].fillna("").replace("", "∅") + "/" + b[col].fillna("").replace("", "∅")
+            confusable &= ~changed | piece.isin(_CONFUSABLE_TEXT)
+            piece = piece.where(changed, "")
+            differs = differs.where(piece == "", differs.where(differs == "", differs + ", ") + piece)
+        return pd.DataFrame({
+            "A_Verb": a["Verb"], "A_pinyin": a["pinyin"], "B_Verb": b["Verb"], "B_pinyin": b["pinyin"],
+            "tone": a["tone_pattern"], "distance": self.distance(i, j).astype(np.int64),
+            "differs": differs, "confusable": confusable & (differs != ""),
+            "A_Eng": a["English_Verb"], "B_Eng": b["English_Verb"],
+        })
@@ -0,0 +1,169 @@
+# network_views.py
+"""
+Character Network builders: the per-version tables and indexes, the class
+filtered graphs with their communities and centralities, and the rendered
+pyvis pages. The page reads them; ``warmup`` calls them with the page's
+default filters.
+
+Graph caches take the dataset version and language-neutral keys (class
+codes, family members) and read the rows published for that version. The
+named ones are preloaded from the analytics bundle when it has been built.
+"""
+import streamlit as st
+from pyvis.network import Network
+
+import analytics
+from bitmap import BitmapIndex
+from clustering import load_clusters
+from compute_cache import computed, filter_key, publish, report, table
+from dataset import CLASS_CODE_COL, VerbIndex, class_name_col, class_names, option_lists, prepare_verbs
+from search import SearchIndex
+
+
+@st.cache_resource
+def prepare_rows(version, _raw):
+    """Rows with class codes/names and a Verb column, once per dataset version (read-only)."""
+    return prepare_verbs(_raw.copy())
+
+
+@st.cache_resource
+def verb_index(version, _df):
+    """Verb and character → row lookups, once per dataset version."""
+    return VerbIndex(_df)
+
+
+@st.cache_data
+def page_options(version, _df):
+    """Option lists for the widgets, once per dataset version."""
+    return option_lists(_df)
+
+
+@st.cache_resource
+def search_index(version, _df):
+    """Hanzi/pinyin/English search index, once per dataset version."""
+    return SearchIndex(_df)
+
+
+@st.cache_resource
+def class_bitmap(version, _df):
+    """Per-class row bitsets, once per dataset version."""
+    return BitmapIndex(_df, [CLASS_CODE_COL])
+
+
+@st.cache_data
+def semantic_clusters(version):
+    """Precomputed cluster labels for this dataset version (None if not built)."""
+    return load_clusters(version)
+
+
+def publish_tables(version, raw):
+    """Prepare and publish the rows and indexes the builders below read; returns the rows."""
+    df = publish(version, 'network_rows', prepare_rows(version, raw))
+    publish(version, 'verb_index', verb_index(version, df))
+    publish(version, 'class_bitmap', class_bitmap(version, df))
+    return df
+
+
+@computed(persist=False)
+def filtered_rows(version, where):
+    """Rows matching a class filter (a ``filter_key``); a cheap bitmap slice, so not stored on disk."""
+    return table(version, 'network_rows')[table(version, 'class_bitmap').mask(dict(where))]
+
+
+@computed(name='network.graph')
+def build_graph(version, where, members=None):
+    """Character graph of the filtered rows, optionally restricted to one family's members."""
+    return analytics.char_graph(filtered_rows(version, where), members)
+
+
+@computed(name='network.communities')
+def get_communities(version, where):
+    return analytics.communities(build_graph(version, where))
+
+
+@computed(name='network.centrality')
+def get_centrality(version, where):
+    """Degree and betweenness centrality of a class-filtered graph."""
+    return analytics.centrality(build_graph(version, where), progress=report)
+
+
+@computed
+def class_labels(version, lang):
+    """Class code → name in ``lang``."""
+    return class_names(table(version, 'network_rows'), lang)
+
+
+def families(communities):
+    """The communities the Word Families tab offers."""
+    return [c for c in communities if len(c) > 2][:20]
+
+
+# Rendered network pages are shared like the graphs: one build per filter and language
+@computed
+def network_html(version, where, lang):
+    """Pyvis page of a class-filtered graph, nodes sized by degree and grouped by class name in ``lang``."""
+    G = build_graph(version, where)
+    degrees = dict(G.degree())
+    min_degree, max_degree = (1, 1)
+    if degrees:
+        min_degree = min(degrees.values())
+        max_degree = max(degrees.values())
+
+    if max_degree == min_degree:
+        normalized_degrees = {node: 15 for node in degrees}
+    else:
+        normalized_degrees = {
+            node: 10 + 25 * (deg - min_degree) / (max_degree - min_degree)
+            for node, deg in degrees.items()
+        }
+
+    net = Network(
+        height='750px', width='100%', notebook=False, directed=True,
+        cdn_resources='in_line', select_menu=True, filter_menu=True
+    )
+
+    # Add nodes, colored/grouped by class (from filtered data, fallback to full df)
+    index = table(version, 'verb_index')
+    class_mask = table(version, 'class_bitmap').mask(dict(where))
+    class_values = table(version, 'network_rows')[class_name_col(lang)].to_numpy()
+    for node, size in normalized_degrees.items():
+        # first filtered row with this character; if none (edge case), its first row overall
+        rows = index.char_rows(node)
+        kept = rows[class_mask[rows]]
+        classification = class_values[kept[0] if len(kept) else rows[0]]
+        net.add_node(node, label=node, size=size, font={'size': size + 10}, group=classification)
+
+    # Add edges for filtered set
+    for _, row in filtered_rows(version, where).iterrows():
+        if row['char1'] and row['char2']:
+            net.add_edge(row['char1'], row['char2'], title=row['Verb'])
+    return net.generate_html()
+
+
+@computed
+def family_html(version, where, members):
+    """Pyvis page of one family's member graph."""
+    C_graph = build_graph(version, where, members)
+    net_fam = Network(height='700px', width='100%', notebook=False, directed=True, cdn_resources='in_line')
+    for node in C_graph.nodes():
+        net_fam.add_node(node, label=node, size=10 + 3*C_graph.degree(node), font={'size': 18})
+    for edge in C_graph.edges(data=True):
+        net_fam.add_edge(edge[0], edge[1], title=edge[2]['title'])
+    return net_fam.generate_html()
+
+
+def warm(version, raw, langs):
+    """Build what the page shows with every class selected, in each of ``langs``."""
+    df = publish_tables(version, raw)
+    where = filter_key({CLASS_CODE_COL: page_options(version, df)['classes']})
+    search_index(version, df)
+    semantic_clusters(version)
+    G = build_graph(version, where)
+    for lang in langs:
+        class_labels(version, lang)
+        network_html(version, where, lang)
+    if len(G.nodes) > 1:
+        get_centrality(version, where)
+        found = families(get_communities(version, where))
+        if found:
+            family_html(version, where, tuple(sorted(found[0])))
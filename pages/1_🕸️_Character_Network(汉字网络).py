@@ -1,12 +1,14 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from utils import page_header, load_data
-from pyvis.network import Network
-import networkx as nx
-import os
+from utils import page_header, load_data, load_bundle, search_jump, lazy_tabs, background_result
+from dataset import CLASS_CODE_COL, class_name_col
+from compute_cache import filter_key, table
+from clustering import DENSITY_COL, adjusted_rand_index, cluster_columns
+from network_views import (build_graph, class_labels, families, family_html, filtered_rows, get_centrality,
+                           get_communities, network_html, page_options, publish_tables, search_index,
+                           semantic_clusters)
 import streamlit.components.v1 as components
-import json
 
 # ----------------------------
 # Page Configuration
@@ -25,6 +27,9 @@ translations = {
         'controls_header': "🔍 Controls",
         'filter_by_class': "Filter by Verb Class",
         'highlight_char': "Select Character to Analyze",
+        'char_search': "Search characters (hanzi or pinyin)",
+        'char_search_placeholder': "e.g. 打, da3, da",
+        'search_none': "No matches.",
         'no_match_warning': "No data to display for the current selection.",
         'network_header': "Interactive Character Network",
         'network_desc': """
@@ -33,6 +38,8 @@ translations = {
         - **Edges:** An arrow indicates a verb is formed (e.g., A → B means the verb is 'AB').
         """,
         'generating_network': "Generating network graph...",
+        'computing_centrality': "Computing centrality for this selection…",
+        'computing_families': "Detecting word families for this selection…",
         'char_stats_header': "Character Statistics Explorer",
         'select_char_prompt': "Please select a character to see its statistics.",
         'starts_verbs_metric': "Starts Verbs",
@@ -58,6 +65,13 @@ translations = {
         'family_select': "Select a Word Family to Explore",
         'family_members': "Family Members",
         'family_verbs_header': "Verbs within this Family",
+        'family_vs_clusters': "Families vs. semantic clusters",
+        'family_vs_clusters_desc': "How the verbs inside each character family spread over meaning-based clusters. Rows are families, columns are clusters.",
+        'cluster_run': "Clustering",
+        'cluster_kmeans': "k-means (k={k})",
+        'cluster_density': "Density",
+        'cluster_agreement': "Agreement (adjusted Rand index)",
+        'clusters_missing': "Semantic clusters are not built for this dataset yet (run `python clustering.py`).",
         'family_graph_header': "Family Network Graph",
         'family_label': "Family",
     },
@@ -69,6 +83,9 @@ translations = {
         'controls_header': "🔍 控制面板",
         'filter_by_class': "按动词类别筛选",
         'highlight_char': "选择要分析的汉字",
+        'char_search': "搜索汉字（汉字或拼音）",
+        'char_search_placeholder': "例如：打、da3、da",
+        'search_none': "没有匹配结果。",
         'no_match_warning': "没有符合当前筛选条件的数据。",
         'network_header': "互动汉字网络",
         'network_desc': """
@@ -77,6 +94,8 @@ translations = {
         - **边：** 箭头表示构成一个动词（例如 A → B 表示“AB”）。
         """,
         'generating_network': "正在生成网络图...",
+        'computing_centrality': "正在计算所选范围的中心性…",
+        'computing_families': "正在识别所选范围的词族…",
         'char_stats_header': "汉字统计浏览器",
         'select_char_prompt': "请选择一个汉字以查看其统计数据。",
         'starts_verbs_metric': "作为首字",
@@ -102,240 +121,220 @@ translations = {
         'family_select': "选择一个词族进行探索",
         'family_members': "词族成员",
         'family_verbs_header': "该词族内的动词",
+        'family_vs_clusters': "词族与语义聚类对照",
+        'family_vs_clusters_desc': "各汉字词族内的动词在语义聚类中的分布。行为词族，列为聚类。",
+        'cluster_run': "聚类方式",
+        'cluster_kmeans': "k-均值（k={k}）",
+        'cluster_density': "密度聚类",
+        'cluster_agreement': "一致性（调整兰德指数）",
+        'clusters_missing': "当前数据集尚未生成语义聚类（请运行 `python clustering.py`）。",
         'family_graph_header': "词族网络图",
         'family_label': "词族",
     }
 }
 
-# ----------------------------
-# Caching Functions
-# ----------------------------
-@st.cache_data
-def build_graph(df):
-    G = nx.DiGraph()
-    for _, row in df.iterrows():
-        if pd.notna(row['char1']) and pd.notna(row['char2']):
-            G.add_edge(row['char1'], row['char2'], title=f"{row['Verb']} ({row['pinyin']})")
-    return G
-
-@st.cache_data
-def get_communities(_G):
-    G_undirected = _G.to_undirected()
-    communities = nx.community.greedy_modularity_communities(G_undirected)
-    return sorted([list(c) for c in communities], key=len, reverse=True)
-
 # ----------------------------
 # Sidebar
 # ----------------------------
 st.sidebar.header("⚙️ Settings / 设置")
 lang_options = {'English': 'en', '中文 (Chinese)': 'zh'}
-selected_lang_display = st.sidebar.radio("Select Language / 选择语言", options=lang_options.keys(), horizontal=True)
+selected_lang_display = st.sidebar.radio("Select Language / 选择语言", options=lang_options.keys(), horizontal=True, key='language')
 lang = lang_options[selected_lang_display]
 T = translations[lang]
 
 page_header(T['page_title'], "🕸️")
 
 # --- Data Loading and Processing ---
-@st.cache_data
-def get_df():
-    return load_data()
-df = get_df()
+raw = load_data()
 
-if df.empty:
+if raw.empty:
     st.error(T['load_error'])
     st.stop()
 
-def parse_bilingual(text):
-    if isinstance(text, str) and '(' in text and ')' in text:
-        parts = text.split('(')
-        zh, en = parts[0], parts[1].replace(')', '')
-        return zh.strip(), en.strip()
-    return text, text
-
-# Bilingual classification
-df[['Classification_zh', 'Classification_en']] = df['分类（Classification）'].apply(lambda x: pd.Series(parse_bilingual(x)))
-df.rename(columns={'Chinese_Verbs': 'Verb'}, inplace=True)
-classification_col_display = 'Classification_zh' if lang == 'zh' else 'Classification_en'
+# Bilingual classification: filters use the class code, names are for display
+DATA_VERSION = raw.attrs.get('version', '')
+load_bundle(DATA_VERSION)
+df = publish_tables(DATA_VERSION, raw)
+classification_col_display = class_name_col(lang)
+class_name = class_labels(DATA_VERSION, lang)
 
 # --- Sidebar Filters (by class) ---
 st.sidebar.header(T['controls_header'])
-unique_classes = sorted(df[classification_col_display].dropna().unique())
-selected_classes = st.sidebar.multiselect(T['filter_by_class'], options=unique_classes, default=unique_classes)
+index = table(DATA_VERSION, 'verb_index')
+options = page_options(DATA_VERSION, df)
+unique_classes = sorted(options['classes'], key=lambda c: class_name.get(c, c))
+selected_classes = st.sidebar.multiselect(T['filter_by_class'], options=unique_classes, default=unique_classes,
+                                          format_func=lambda c: class_name.get(c, c))
 
 # Filter data by selected classes
-filtered_df = df[df[classification_col_display].isin(selected_classes)].copy()
-G = build_graph(filtered_df)
+class_key = filter_key({CLASS_CODE_COL: selected_classes})
+class_rows = table(DATA_VERSION, 'class_bitmap')
+class_mask = class_rows.mask({CLASS_CODE_COL: selected_classes})
+filtered_df = filtered_rows(DATA_VERSION, class_key)
+G = build_graph(DATA_VERSION, class_key)
 
 # ----------------------------
 # Main Content Tabs
 # ----------------------------
-tab1, tab2, tab3, tab4 = st.tabs([T['tab_network'], T['tab_pathways'], T['tab_families'], T['tab_stats']])
+tab1, tab2, tab3, tab4 = lazy_tabs([T['tab_network'], T['tab_pathways'], T['tab_families'], T['tab_stats']], 'network_tab')
 
 # ----------------------------
 # TAB 1 – Network Graph
 # ----------------------------
 with tab1:
-    st.header(T['network_header'])
-    st.markdown(T['network_desc'])
-
-    if not filtered_df.empty:
-        with st.spinner(T['generating_network']):
-            # Compute node sizes from degree on filtered graph
-            degrees = dict(G.degree())
-            min_degree, max_degree = (1, 1)
-            if degrees:
-                min_degree = min(degrees.values())
-                max_degree = max(degrees.values())
-
-            if max_degree == min_degree:
-                normalized_degrees = {node: 15 for node in degrees}
-            else:
-                normalized_degrees = {
-                    node: 10 + 25 * (deg - min_degree) / (max_degree - min_degree)
-                    for node, deg in degrees.items()
-                }
-
-            net = Network(
-                height='750px', width='100%', notebook=False, directed=True,
-                cdn_resources='in_line', select_menu=True, filter_menu=True
-            )
-
-            # Add nodes, colored/grouped by class (from filtered data, fallback to full df)
-            for node, size in normalized_degrees.items():
-                # try filtered_df first; if node not present (edge case), fallback to df
-                pool = filtered_df if ((filtered_df['char1'] == node) | (filtered_df['char2'] == node)).any() else df
-                classification = pool.loc[(pool['char1'] == node) | (pool['char2'] == node), classification_col_display].iloc[0]
-                net.add_node(node, label=node, size=size, font={'size': size + 10}, group=classification)
+    if tab1.open:
+        st.header(T['network_header'])
+        st.markdown(T['network_desc'])
 
-            # Add edges for filtered set
-            for _, row in filtered_df.iterrows():
-                if row['char1'] and row['char2']:
-                    net.add_edge(row['char1'], row['char2'], title=row['Verb'])
-
-            try:
-                file_path = 'verb_network.html'
-                net.save_graph(file_path)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    source_code = f.read()
-                st.components.v1.html(source_code, height=800)
-                os.remove(file_path)
-            except Exception as e:
-                st.error(f"Error displaying network graph: {e}")
-    else:
-        st.warning(T['no_match_warning'])
+        if not filtered_df.empty:
+            with st.spinner(T['generating_network']):
+                try:
+                    st.components.v1.html(network_html(DATA_VERSION, class_key, lang), height=800)
+                except Exception as e:
+                    st.error(f"Error displaying network graph: {e}")
+        else:
+            st.warning(T['no_match_warning'])
 
 # ----------------------------
 # TAB 2 – Learning Pathways
 # ----------------------------
 with tab2:
-    st.header(T['learning_pathways_header'])
-    st.markdown(T['learning_pathways_desc'])
+    if tab2.open:
+        st.header(T['learning_pathways_header'])
+        st.markdown(T['learning_pathways_desc'])
 
-    if len(G.nodes) > 1:
-        col1, col2 = st.columns(2)
-        in_degree = dict(G.in_degree())
-        out_degree = dict(G.out_degree())
-        
-        with col1:
-            with st.expander(T['centrality_expander'], expanded=True):
-                st.markdown(T['centrality_desc'])
-                degree_cent = nx.degree_centrality(G)
-                top_degree = sorted(degree_cent.items(), key=lambda x: -x[1])[:10]
-                df_degree = pd.DataFrame(top_degree, columns=[T['character_col'], T['score_col']])
-                df_degree[T['in_degree_col']] = df_degree[T['character_col']].map(in_degree)
-                df_degree[T['out_degree_col']] = df_degree[T['character_col']].map(out_degree)
-                df_degree[T['score_col']] = df_degree[T['score_col']].round(3)
+        centrality = None
+        if len(G.nodes) > 1:
+            centrality = background_result(get_centrality, T['computing_centrality'], DATA_VERSION, class_key)
+        else:
+            st.warning(T['no_match_warning'])
+        if centrality is not None:
+            degree_cent, between_cent = centrality
+            col1, col2 = st.columns(2)
+            in_degree = dict(G.in_degree())
+            out_degree = dict(G.out_degree())
+
+            with col1:
+                with st.expander(T['centrality_expander'], expanded=True):
+                    st.markdown(T['centrality_desc'])
+                    top_degree = sorted(degree_cent.items(), key=lambda x: -x[1])[:10]
+                    df_degree = pd.DataFrame(top_degree, columns=[T['character_col'], T['score_col']])
+                    df_degree[T['in_degree_col']] = df_degree[T['character_col']].map(in_degree)
+                    df_degree[T['out_degree_col']] = df_degree[T['character_col']].map(out_degree)
+                    df_degree[T['score_col']] = df_degree[T['score_col']].round(3)
                 
-                fig = px.bar(df_degree, x=T['score_col'], y=T['character_col'], orientation='h', text_auto=True)
-                fig.update_layout(yaxis={'categoryorder':'total ascending'})
-                st.plotly_chart(fig, use_container_width=True)
-                st.dataframe(df_degree, use_container_width=True)
+                    fig = px.bar(df_degree, x=T['score_col'], y=T['character_col'], orientation='h', text_auto=True)
+                    fig.update_layout(yaxis={'categoryorder':'total ascending'})
+                    st.plotly_chart(fig, use_container_width=True)
+                    st.dataframe(df_degree, use_container_width=True)
 
-        with col2:
-            with st.expander(T['betweenness_expander'], expanded=True):
-                st.markdown(T['betweenness_desc'])
-                between_cent = nx.betweenness_centrality(G)
-                top_between = sorted(between_cent.items(), key=lambda x: -x[1])[:10]
-                df_between = pd.DataFrame(top_between, columns=[T['character_col'], T['score_col']])
-                df_between[T['in_degree_col']] = df_between[T['character_col']].map(in_degree)
-                df_between[T['out_degree_col']] = df_between[T['character_col']].map(out_degree)
-                df_between[T['score_col']] = df_between[T['score_col']].round(3)
+            with col2:
+                with st.expander(T['betweenness_expander'], expanded=True):
+                    st.markdown(T['betweenness_desc'])
+                    top_between = sorted(between_cent.items(), key=lambda x: -x[1])[:10]
+                    df_between = pd.DataFrame(top_between, columns=[T['character_col'], T['score_col']])
+                    df_between[T['in_degree_col']] = df_between[T['character_col']].map(in_degree)
+                    df_between[T['out_degree_col']] = df_between[T['character_col']].map(out_degree)
+                    df_between[T['score_col']] = df_between[T['score_col']].round(3)
                
-                fig = px.bar(df_between, x=T['score_col'], y=T['character_col'], orientation='h', text_auto=True)
-                fig.update_layout(yaxis={'categoryorder':'total ascending'})
-                st.plotly_chart(fig, use_container_width=True)
-                st.dataframe(df_between, use_container_width=True)
-    else:
-        st.warning(T['no_match_warning'])
+                    fig = px.bar(df_between, x=T['score_col'], y=T['character_col'], orientation='h', text_auto=True)
+                    fig.update_layout(yaxis={'categoryorder':'total ascending'})
+                    st.plotly_chart(fig, use_container_width=True)
+                    st.dataframe(df_between, use_container_width=True)
 
 # ----------------------------
 # TAB 3 – Word Families
 # ----------------------------
 with tab3:
-    st.header(T['families_header'])
-    st.markdown(T['families_desc'])
+    if tab3.open:
+        st.header(T['families_header'])
+        st.markdown(T['families_desc'])
     
-    if len(G.nodes) > 1:
-        communities = [c for c in get_communities(G) if len(c) > 2][:20]
-        if communities:
-            fam_options = {f"{T['family_label']} {i+1} ({len(c)} {T['character_col']}s)": c for i, c in enumerate(communities)}
-            selected_fam_label = st.selectbox(T['family_select'], options=fam_options.keys())
+        if len(G.nodes) > 1:
+            found = background_result(get_communities, T['computing_families'], DATA_VERSION, class_key)
+            communities = families(found) if found is not None else None
+            if communities:
+                # Panels are fragments: their widgets rerun the panel, not the page
+                @st.fragment
+                def family_panel(communities, filtered_df):
+                    """Family picker with its member graph and verb list."""
+                    fam_options = {f"{T['family_label']} {i+1} ({len(c)} {T['character_col']}s)": c for i, c in enumerate(communities)}
+                    selected_fam_label = st.selectbox(T['family_select'], options=fam_options.keys())
             
-            if selected_fam_label:
-                selected_community = fam_options[selected_fam_label]
-                st.info(f"**{T['family_members']}:** {', '.join(selected_community)}")
+                    if selected_fam_label:
+                        selected_community = fam_options[selected_fam_label]
+                        st.info(f"**{T['family_members']}:** {', '.join(selected_community)}")
                 
-                community_verbs_df = filtered_df[filtered_df['char1'].isin(selected_community) & filtered_df['char2'].isin(selected_community)]
+                        community_verbs_df = filtered_df[filtered_df['char1'].isin(selected_community) & filtered_df['char2'].isin(selected_community)]
                 
-                st.subheader(T['family_graph_header'])
-                if not community_verbs_df.empty:
-                    C_graph = build_graph(community_verbs_df)
-                    net_fam = Network(height='700px', width='100%', notebook=False, directed=True, cdn_resources='in_line')
-                    for node in C_graph.nodes():
-                        net_fam.add_node(node, label=node, size=10 + 3*C_graph.degree(node), font={'size': 18})
-                    for edge in C_graph.edges(data=True):
-                        net_fam.add_edge(edge[0], edge[1], title=edge[2]['title'])
-                    
-                    try:
-                        file_path_fam = 'family_network.html'
-                        net_fam.save_graph(file_path_fam)
-                        with open(file_path_fam, 'r', encoding='utf-8') as f:
-                            source_code_fam = f.read()
-                        components.html(source_code_fam, height=550)
-                        if os.path.exists(file_path_fam):
-                            os.remove(file_path_fam)
-                    except Exception as e:
-                        st.error(f"Error displaying graph: {e}")
+                        st.subheader(T['family_graph_header'])
+                        if not community_verbs_df.empty:
+                            try:
+                                components.html(family_html(DATA_VERSION, class_key, tuple(sorted(selected_community))), height=550)
+                            except Exception as e:
+                                st.error(f"Error displaying graph: {e}")
                 
-                st.subheader(T['family_verbs_header'])
-                st.dataframe(community_verbs_df[['Verb', 'pinyin', 'English_Verb', classification_col_display]], use_container_width=True)
+                        st.subheader(T['family_verbs_header'])
+                        st.dataframe(community_verbs_df[['Verb', 'pinyin', 'English_Verb', classification_col_display]], use_container_width=True)
+                family_panel(communities, filtered_df)
+
+                @st.fragment
+                def family_cluster_panel(communities, filtered_df):
+                    """Family × semantic cluster cross-tab for the chosen clustering run."""
+                    with st.expander(T['family_vs_clusters'], expanded=False):
+                        clusters = semantic_clusters(DATA_VERSION)
+                        if clusters is None:
+                            st.caption(T['clusters_missing'])
+                        else:
+                            st.caption(T['family_vs_clusters_desc'])
+                            run = st.selectbox(T['cluster_run'], options=cluster_columns(clusters),
+                                               format_func=lambda c: T['cluster_density'] if c == DENSITY_COL else T['cluster_kmeans'].format(k=c[len('cluster_k'):]))
+                            member = {ch: i + 1 for i, c in enumerate(communities) for ch in c}
+                            fam1, fam2 = filtered_df['char1'].map(member), filtered_df['char2'].map(member)
+                            intra = filtered_df.loc[fam1.notna() & (fam1 == fam2), ['Verb']].assign(family=fam1.astype('Int64'))
+                            intra[run] = intra['Verb'].map(clusters.set_index('Verb')[run])
+                            intra = intra.dropna(subset=[run])
+                            if intra.empty:
+                                st.warning(T['no_match_warning'])
+                            else:
+                                xtab = pd.crosstab(intra['family'], intra[run].astype(int))
+                                xtab.index = [f"{T['family_label']} {i}" for i in xtab.index]
+                                st.metric(T['cluster_agreement'], f"{adjusted_rand_index(intra['family'], intra[run]):.3f}")
+                                st.dataframe(xtab, use_container_width=True)
+                family_cluster_panel(communities, filtered_df)
+            elif communities is not None:
+                st.warning(T['no_match_warning'])
         else:
             st.warning(T['no_match_warning'])
-    else:
-        st.warning(T['no_match_warning'])
 
 # ----------------------------
 # TAB 4 – Character Statistics
 # ----------------------------
 with tab4:
-    st.header(T['char_stats_header'])
+    if tab4.open:
+        st.header(T['char_stats_header'])
     
-    all_chars = sorted(list(G.nodes()))
-    selected_char = st.selectbox(T['highlight_char'], options=[''] + all_chars)
+        @st.fragment
+        def char_stats_panel(G, class_mask):
+            """Character picker with its degree metrics and verb list."""
+            all_chars = sorted(list(G.nodes()))
+            search_jump(search_index(DATA_VERSION, df), 'stats_char', all_chars, T['char_search'],
+                        T['char_search_placeholder'], T['search_none'], kinds=('char',))
+            selected_char = st.selectbox(T['highlight_char'], options=[''] + all_chars, key='stats_char')
 
-    if selected_char and selected_char in G:
-        st.subheader(f"'{selected_char}'")
-        col1, col2, col3 = st.columns(3)
-        col1.metric(T['starts_verbs_metric'], G.out_degree(selected_char))
-        col2.metric(T['ends_verbs_metric'], G.in_degree(selected_char))
-        col3.metric(T['total_verbs_metric'], G.degree(selected_char))
+            if selected_char and selected_char in G:
+                st.subheader(f"'{selected_char}'")
+                col1, col2, col3 = st.columns(3)
+                col1.metric(T['starts_verbs_metric'], G.out_degree(selected_char))
+                col2.metric(T['ends_verbs_metric'], G.in_degree(selected_char))
+                col3.metric(T['total_verbs_metric'], G.degree(selected_char))
         
-        with st.expander(T['verbs_list_expander']):
-            st.dataframe(
-                filtered_df[
-                    (filtered_df['char1'] == selected_char) | (filtered_df['char2'] == selected_char)
-                ][['Verb', 'pinyin', 'English_Verb', classification_col_display]].drop_duplicates(),
-                use_container_width=True
-            )
-    else:
-        st.info(T['select_char_prompt'])
+                with st.expander(T['verbs_list_expander']):
+                    char_rows = index.char_rows(selected_char)
+                    st.dataframe(
+                        df.iloc[char_rows[class_mask[char_rows]]][['Verb', 'pinyin', 'English_Verb', classification_col_display]].drop_duplicates(),
+                        use_container_width=True
+                    )
+            else:
+                st.info(T['select_char_prompt'])
+        char_stats_panel(G, class_mask)
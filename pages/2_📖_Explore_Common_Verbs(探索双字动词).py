@@ -1,9 +1,13 @@
 import streamlit as st
-import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from utils import page_header, load_data
-import os
+from utils import page_header, load_data, search_jump, lazy_tabs
+from dataset import class_name_col
+from semantic import density_grid
+from clustering import DENSITY_COL, cluster_columns
+from explore_views import (class_labels, filter_bitmap, page_options, publish_tables, search_index,
+                           semantic_clusters, semantic_index, tone_flow_cube, verb_index)
 
 # ----------------------------
 # Page Configuration & Header
@@ -23,6 +27,9 @@ translations = {
         'filter_by_category': "Filter by Verb Category",
         'filter_by_tone': "Filter by Tone Pattern",
         'highlight_verb': "Highlight a Specific Verb",
+        'verb_search': "Search verbs (hanzi, pinyin or English)",
+        'verb_search_placeholder': "e.g. 打开, da3kai1, dakai, open",
+        'search_none': "No matches among the filtered verbs.",
         'no_match_warning': "No verbs match the current filter selection.",
         'tab_semantic': "🗺️ Semantic Map",
         'tab_tonal': "🌊 Tonal Flow",
@@ -39,6 +46,28 @@ translations = {
         'metric_category': "Category",
         'metric_tone': "Tone Pattern",
         'metric_prob': "Transition Probability",
+        'similar_k': "Similar verbs to show",
+        'similar_space': "Similarity based on",
+        'space_umap': "Map position",
+        'space_embedding': "Meaning vectors",
+        'similar_header': "Verbs most similar to",
+        'similar_rank': "Rank",
+        'similar_distance': "Distance",
+        'similar_legend': "Similar",
+        'selected_legend': "Selected",
+        'map_window': "Zoom window",
+        'map_window_x': "Horizontal range",
+        'map_window_y': "Vertical range",
+        'map_density_note': "{n:,} verbs in view: showing density. Narrow the zoom window to {limit:,} or fewer to see individual verbs.",
+        'map_density_count': "Verbs",
+        'color_by': "Colour by",
+        'color_category': "Verb category",
+        'color_kmeans': "Semantic clusters (k={k})",
+        'color_density': "Density clusters",
+        'cluster_filter': "Show clusters",
+        'cluster_label': "Cluster {c}",
+        'cluster_noise': "Unclustered",
+        'clusters_missing': "Semantic clusters are not built for this dataset yet (run `python clustering.py`).",
         'tonal_header': "Tonal Flow in Two-Character Verbs",
         'tonal_desc': """
         This Sankey diagram shows the most common tone patterns. The width of the flow from a
@@ -59,6 +88,9 @@ translations = {
         'filter_by_category': "按动词类别筛选",
         'filter_by_tone': "按声调模式筛选",
         'highlight_verb': "高亮特定动词",
+        'verb_search': "搜索动词（汉字、拼音或英文）",
+        'verb_search_placeholder': "例如：打开、da3kai1、dakai、open",
+        'search_none': "筛选后的动词中没有匹配结果。",
         'no_match_warning': "没有符合当前筛选条件的动词。",
         'tab_semantic': "🗺️ 语义地图",
         'tab_tonal': "🌊 声调流向",
@@ -75,6 +107,28 @@ translations = {
         'metric_category': "类别",
         'metric_tone': "声调模式",
         'metric_prob': "转换概率",
+        'similar_k': "显示相似动词数量",
+        'similar_space': "相似度依据",
+        'space_umap': "地图位置",
+        'space_embedding': "语义向量",
+        'similar_header': "最相似的动词",
+        'similar_rank': "排名",
+        'similar_distance': "距离",
+        'similar_legend': "相似",
+        'selected_legend': "已选",
+        'map_window': "缩放窗口",
+        'map_window_x': "横向范围",
+        'map_window_y': "纵向范围",
+        'map_density_note': "视图中有 {n:,} 个动词：显示密度图。将缩放窗口缩小到 {limit:,} 个以内即可查看单个动词。",
+        'map_density_count': "动词数",
+        'color_by': "着色依据",
+        'color_category': "动词类别",
+        'color_kmeans': "语义聚类（k={k}）",
+        'color_density': "密度聚类",
+        'cluster_filter': "显示的聚类",
+        'cluster_label': "聚类 {c}",
+        'cluster_noise': "未归类",
+        'clusters_missing': "当前数据集尚未生成语义聚类（请运行 `python clustering.py`）。",
         'tonal_header': "双字动词的声调流向",
         'tonal_desc': """
         此桑基图显示了最常见的声调模式。从第一个字声调（左）到第二个字声调（右）的流量宽度，
@@ -95,7 +149,8 @@ lang_options = {'English': 'en', '中文 (Chinese)': 'zh'}
 selected_lang_display = st.sidebar.radio(
     "Select Language / 选择语言",
     options=lang_options.keys(),
-    horizontal=True
+    horizontal=True,
+    key='language'
 )
 lang = lang_options[selected_lang_display]
 T = translations[lang]
@@ -105,128 +160,209 @@ page_header(T['page_title'], "📖")
 # ----------------------------
 # Load and Process Data
 # ----------------------------
-df = load_data()
+raw = load_data()
 
-if df.empty:
+if raw.empty:
     st.error(T['load_error'])
     st.stop()
 
-def parse_bilingual(text):
-    if isinstance(text, str) and '(' in text and ')' in text:
-        parts = text.split('(')
-        zh = parts[0]
-        en = parts[1].replace(')', '')
-        return zh.strip(), en.strip()
-    return text, text
+# Filters and caches work on the class code; the display language only picks names
+DATA_VERSION = raw.attrs.get('version', '')
+df = publish_tables(DATA_VERSION, raw)
+classification_col_display = class_name_col(lang)
+class_name = class_labels(DATA_VERSION, lang)
 
-df[['Classification_zh', 'Classification_en']] = df['分类（Classification）'].apply(lambda x: pd.Series(parse_bilingual(x)))
-df.rename(columns={'Chinese_Verbs': 'Verb'}, inplace=True)
-classification_col_display = 'Classification_zh' if lang == 'zh' else 'Classification_en'
+index = verb_index(DATA_VERSION, df)
+options = page_options(DATA_VERSION, df)
 
 # ----------------------------
 # Sidebar for Filters & Controls
 # ----------------------------
 st.sidebar.header(T['controls_header'])
 
-type_mapping = df.set_index(classification_col_display)['verb_type'].to_dict()
-unique_display_types = sorted(df[classification_col_display].unique())
+unique_types = sorted(options['classes'], key=lambda c: class_name.get(c, c))
 
-selected_display_types = st.sidebar.multiselect(
+selected_types_internal = st.sidebar.multiselect(
     T['filter_by_category'],
-    options=unique_display_types,
-    default=unique_display_types
+    options=unique_types,
+    default=unique_types,
+    format_func=lambda c: class_name.get(c, c)
 )
-selected_types_internal = [type_mapping.get(t) for t in selected_display_types if t in type_mapping]
 
-unique_tone_patterns = sorted(df['tone_pattern'].unique())
+unique_tone_patterns = options['tones']
 selected_tones = st.sidebar.multiselect(
     T['filter_by_tone'],
     options=unique_tone_patterns,
     default=unique_tone_patterns
 )
 
-filtered_df = df[df['verb_type'].isin(selected_types_internal) & df['tone_pattern'].isin(selected_tones)].copy()
+row_filter = filter_bitmap(DATA_VERSION, df).mask({'verb_type': selected_types_internal, 'tone_pattern': selected_tones})
+filtered_df = df[row_filter].copy()
+flow_cube = tone_flow_cube(DATA_VERSION, df)
+sem_index = semantic_index(DATA_VERSION, df)
+clusters = semantic_clusters(DATA_VERSION)
+
+# Above this many points in the zoom window the map is drawn as a density grid
+MAP_POINT_LIMIT = 20000
+MAP_BINS = 150
 
 # ----------------------------
 # Main Content in Tabs
 # ----------------------------
-tab1, tab2 = st.tabs([T['tab_semantic'], T['tab_tonal']])
+tab1, tab2 = lazy_tabs([T['tab_semantic'], T['tab_tonal']], 'verbs_tab')
 
 # --- Tab 1: Semantic Map ---
 with tab1:
-    st.header(T['semantic_header'])
-    st.markdown(T['semantic_desc'])
+    if tab1.open:
+        st.header(T['semantic_header'])
+        st.markdown(T['semantic_desc'])
     
-    # --- Highlight verb selectbox is now INSIDE the tab ---
-    search_verb = st.selectbox(
-        T['highlight_verb'],
-        options=[''] + sorted(list(filtered_df['Verb'].unique())),
-        format_func=lambda x: f"{x} ({df[df['Verb'] == x]['pinyin'].iloc[0]})" if x else "None"
-    )
-
-    if filtered_df.empty:
-        st.warning(T['no_match_warning'])
-    else:
-        fig_umap = px.scatter(
-            filtered_df,
-            x='umap_x',
-            y='umap_y',
-            color='verb_type',
-            hover_data={
-                'Verb': True, 'pinyin': True, 'English_Verb': True,
-                classification_col_display: True, 'verb_type': False,
-                'umap_x': False, 'umap_y': False
-            },
-            labels={'verb_type': T['category_legend_title']},
-            template='plotly_white'
+        # --- Highlight verb selectbox is now INSIDE the tab ---
+        verb_options = index.verbs_in(row_filter)
+        search_jump(search_index(DATA_VERSION, df), 'highlight_verb', verb_options, T['verb_search'],
+                    T['verb_search_placeholder'], T['search_none'])
+        search_verb = st.selectbox(
+            T['highlight_verb'],
+            options=[''] + verb_options,
+            format_func=lambda x: index.label(x) if x else "None",
+            key='highlight_verb'
         )
-        fig_umap.update_layout(height=600, legend_title_text=T['category_legend_title'])
-        fig_umap.update_traces(marker=dict(size=8, opacity=0.7))
-
-        legend_name_mapping = df.set_index('verb_type')[classification_col_display].to_dict()
-        fig_umap.for_each_trace(lambda t: t.update(name=legend_name_mapping.get(t.name, t.name)))
 
+        similar = sem_index.nearest([], 0)
         if search_verb:
-            highlight_df = filtered_df[filtered_df['Verb'] == search_verb]
-            if not highlight_df.empty:
-                fig_umap.add_trace(go.Scatter(
-                    x=highlight_df['umap_x'], y=highlight_df['umap_y'],
-                    mode='markers', marker=dict(color='black', size=16, symbol='star'),
-                    name='Selected', hoverinfo='skip'
+            col_k, col_space = st.columns(2)
+            with col_k:
+                n_similar = st.slider(T['similar_k'], min_value=0, max_value=30, value=10)
+            with col_space:
+                space = st.radio(T['similar_space'], options=sem_index.spaces, horizontal=True,
+                                 format_func=lambda sp: T[f'space_{sp}']) if len(sem_index.spaces) > 1 else 'umap'
+            if n_similar:
+                similar = sem_index.nearest(search_verb, n_similar, space)
+
+        if filtered_df.empty:
+            st.warning(T['no_match_warning'])
+        else:
+            # Colour / filter dimension: verb category or a precomputed cluster run
+            color_options = ['verb_type'] + cluster_columns(clusters)
+            def color_name(col):
+                if col == 'verb_type':
+                    return T['color_category']
+                if col == DENSITY_COL:
+                    return T['color_density']
+                return T['color_kmeans'].format(k=col[len('cluster_k'):])
+            if clusters is None:
+                st.caption(T['clusters_missing'])
+            color_col = st.selectbox(T['color_by'], options=color_options, format_func=color_name)
+            map_df = filtered_df
+            if color_col != 'verb_type':
+                cluster_of = clusters.set_index('Verb')[color_col]
+                map_df = map_df.assign(**{color_col: map_df['Verb'].map(cluster_of).fillna(-1).astype(int)})
+                cluster_ids = sorted(map_df[color_col].unique())
+                cluster_pick = st.multiselect(
+                    T['cluster_filter'], options=cluster_ids, default=cluster_ids,
+                    format_func=lambda c: T['cluster_noise'] if c < 0 else T['cluster_label'].format(c=c)
+                )
+                map_df = map_df[map_df[color_col].isin(cluster_pick)]
+
+            # Zoom window: only points inside it are sent to the browser
+            x_all, y_all = df['umap_x'], df['umap_y']
+            x_lo, x_hi = float(x_all.min()), float(x_all.max())
+            y_lo, y_hi = float(y_all.min()), float(y_all.max())
+            with st.expander(T['map_window'], expanded=False):
+                x_win = st.slider(T['map_window_x'], x_lo, x_hi, (x_lo, x_hi))
+                y_win = st.slider(T['map_window_y'], y_lo, y_hi, (y_lo, y_hi))
+            fx, fy = map_df['umap_x'].to_numpy(), map_df['umap_y'].to_numpy()
+            in_view = (fx >= x_win[0]) & (fx <= x_win[1]) & (fy >= y_win[0]) & (fy <= y_win[1])
+            n_view = int(in_view.sum())
+
+            fig_umap = go.Figure()
+            if n_view > MAP_POINT_LIMIT:
+                # Density view: binned on the server, payload is MAP_BINS² cells
+                counts, xc, yc = density_grid(fx[in_view], fy[in_view], x_win, y_win, MAP_BINS)
+                fig_umap.add_trace(go.Heatmap(
+                    x=xc, y=yc, z=np.where(counts > 0, counts, np.nan), colorscale='Viridis',
+                    colorbar=dict(title=T['map_density_count']),
+                    hovertemplate=f"{T['map_density_count']}: %{{z}}<extra></extra>"
                 ))
-        st.plotly_chart(fig_umap, use_container_width=True)
+                st.caption(T['map_density_note'].format(n=n_view, limit=MAP_POINT_LIMIT))
+            else:
+                # Point view: one WebGL trace per category, with columnar hover data
+                view = map_df.loc[in_view, list(dict.fromkeys(['umap_x', 'umap_y', color_col, 'Verb', 'pinyin', 'English_Verb', classification_col_display]))]
+                if color_col == 'verb_type':
+                    legend_name_mapping = class_name
+                else:
+                    legend_name_mapping = {c: T['cluster_noise'] if c < 0 else T['cluster_label'].format(c=c) for c in view[color_col].unique()}
+                palette = px.colors.qualitative.Plotly if color_col == 'verb_type' else px.colors.qualitative.Alphabet
+                for i, (vtype, grp) in enumerate(view.groupby(color_col, sort=color_col != 'verb_type')):
+                    fig_umap.add_trace(go.Scattergl(
+                        x=grp['umap_x'].to_numpy(), y=grp['umap_y'].to_numpy(), mode='markers',
+                        marker=dict(size=8, opacity=0.7, color=palette[i % len(palette)]),
+                        name=legend_name_mapping.get(vtype, vtype),
+                        customdata=grp[['Verb', 'pinyin', 'English_Verb', classification_col_display]].to_numpy(),
+                        hovertemplate='<b>%{customdata[0]}</b> %{customdata[1]}<br>%{customdata[2]}<br>%{customdata[3]}<extra></extra>'
+                    ))
+            fig_umap.update_layout(height=600, legend_title_text=color_name(color_col), template='plotly_white',
+                                   xaxis=dict(range=list(x_win), title='umap_x'), yaxis=dict(range=list(y_win), title='umap_y'))
 
-        if search_verb:
-            verb_details = df[df['Verb'] == search_verb].iloc[0]
-            st.subheader(f"{T['details_for']}: {verb_details['Verb']} ({verb_details['pinyin']})")
-            col1, col2, col3, col4 = st.columns(4)
-            col1.metric(T['metric_english'], verb_details['English_Verb'])
-            col2.metric(T['metric_category'], verb_details[classification_col_display])
-            col3.metric(T['metric_tone'], verb_details['tone_pattern'])
-            col4.metric(T['metric_prob'], f"{verb_details['transition_probability_PerVerbType']:.2%}")
+            if not similar.empty:
+                similar_xy = sem_index.points['umap'][sem_index.positions(similar['Verb'].tolist())]
+                fig_umap.add_trace(go.Scattergl(
+                    x=similar_xy[:, 0], y=similar_xy[:, 1], text=similar['Verb'],
+                    mode='markers', marker=dict(color='black', size=11, symbol='circle-open', line=dict(width=2)),
+                    name=T['similar_legend'], hovertemplate='%{text}<extra></extra>'
+                ))
+            if search_verb:
+                verb_rows = index.rows(search_verb)
+                highlight_df = df.iloc[verb_rows[row_filter[verb_rows]]]
+                if not highlight_df.empty:
+                    fig_umap.add_trace(go.Scattergl(
+                        x=highlight_df['umap_x'], y=highlight_df['umap_y'],
+                        mode='markers', marker=dict(color='black', size=16, symbol='star'),
+                        name=T['selected_legend'], hoverinfo='skip'
+                    ))
+            st.plotly_chart(fig_umap, use_container_width=True)
+
+            if search_verb:
+                verb_details = index.record(search_verb)
+                st.subheader(f"{T['details_for']}: {verb_details['Verb']} ({verb_details['pinyin']})")
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric(T['metric_english'], verb_details['English_Verb'])
+                col2.metric(T['metric_category'], verb_details[classification_col_display])
+                col3.metric(T['metric_tone'], verb_details['tone_pattern'])
+                col4.metric(T['metric_prob'], f"{verb_details['transition_probability_PerVerbType']:.2%}")
+
+                if not similar.empty:
+                    st.subheader(f"{T['similar_header']} {search_verb}")
+                    similar_table = similar.drop(columns=['query', 'verb_type'], errors='ignore').rename(
+                        columns={'rank': T['similar_rank'], 'distance': T['similar_distance']})
+                    st.dataframe(similar_table, hide_index=True, use_container_width=True)
 
 # --- Tab 2: Tonal Flow ---
 with tab2:
-    st.header(T['tonal_header'])
-    st.markdown(T['tonal_desc'])
+    if tab2.open:
+        st.header(T['tonal_header'])
+        st.markdown(T['tonal_desc'])
 
-    if not filtered_df.empty:
-        sankey_data = filtered_df.groupby(['first_char_tone', 'second_char_tone']).size().reset_index(name='count')
-        labels = [T['sankey_tone_1st'].format(t=t) for t in range(1, 6)] + \
-                 [T['sankey_tone_2nd'].format(t=t) for t in range(1, 6)]
+        if not filtered_df.empty:
+            flow = flow_cube.frame('first_char_tone', 'second_char_tone',
+                                   where={'verb_type': selected_types_internal, 'tone_pattern': selected_tones})
+            sankey_data = flow.stack().rename('count').reset_index()
+            sankey_data = sankey_data[sankey_data['count'] > 0]
+            labels = [T['sankey_tone_1st'].format(t=t) for t in range(1, 6)] + \
+                     [T['sankey_tone_2nd'].format(t=t) for t in range(1, 6)]
         
-        # Adjust for tones including neutral tone (often marked as 5 or 0)
-        sankey_data = sankey_data[(sankey_data['first_char_tone'] > 0) & (sankey_data['second_char_tone'] > 0)]
+            # Adjust for tones including neutral tone (often marked as 5 or 0)
+            sankey_data = sankey_data[(sankey_data['first_char_tone'] > 0) & (sankey_data['second_char_tone'] > 0)]
         
-        source = sankey_data['first_char_tone'].apply(lambda t: t - 1)
-        target = sankey_data['second_char_tone'].apply(lambda t: t + 4) # Adjust target index
-        value = sankey_data['count']
-
-        fig_sankey = go.Figure(data=[go.Sankey(
-            node=dict(pad=15, thickness=20, line=dict(color="black", width=0.5), label=labels, color="royalblue"),
-            link=dict(source=source, target=target, value=value)
-        )])
-        fig_sankey.update_layout(title_text=T['sankey_title'], font_size=12, height=400)
-        st.plotly_chart(fig_sankey, use_container_width=True)
-    else:
-        st.warning(T['no_sankey_data'])
+            source = sankey_data['first_char_tone'].apply(lambda t: t - 1)
+            target = sankey_data['second_char_tone'].apply(lambda t: t + 4) # Adjust target index
+            value = sankey_data['count']
+
+            fig_sankey = go.Figure(data=[go.Sankey(
+                node=dict(pad=15, thickness=20, line=dict(color="black", width=0.5), label=labels, color="royalblue"),
+                link=dict(source=source, target=target, value=value)
+            )])
+            fig_sankey.update_layout(title_text=T['sankey_title'], font_size=12, height=400)
+            st.plotly_chart(fig_sankey, use_container_width=True)
+        else:
+            st.warning(T['no_sankey_data'])
@@ -0,0 +1,91 @@
+# phonetic_query.py
+"""
+Compound phonetic constraints for the deck builders.
+
+A query is a list of clauses joined by AND; each clause tests one field
+against several values (OR). The text form is::
+
+    i1 in zh,ch,sh and f2 endswith ng and tone in 3-4,2-5
+
+Clauses are compiled against the value labels of a ``BitmapIndex`` (a few
+dozen labels per field), so evaluating a query is a bitset lookup no matter
+how many rows the table has.
+"""
+import re
+from typing import NamedTuple
+
+FIELD_ALIASES = {
+    "i1": "initial_1", "initial_1": "initial_1",
+    "f1": "final_1", "final_1": "final_1",
+    "i2": "initial_2", "initial_2": "initial_2",
+    "f2": "final_2", "final_2": "final_2",
+    "tone": "tone_pattern", "tone_pattern": "tone_pattern",
+    "src": "src_tone", "src_tone": "src_tone",
+    "dst": "dst_tone", "dst_tone": "dst_tone",
+}
+QUERY_FIELDS = sorted(set(FIELD_ALIASES.values()))
+
+OPS = {
+    "in": lambda label, values: label in values,
+    "not in": lambda label, values: label not in values,
+    "startswith": lambda label, values: label.startswith(tuple(values)),
+    "endswith": lambda label, values: label.endswith(tuple(values)),
+}
+OP_ALIASES = {"in": "in", "=": "in", "==": "in", "not in": "not in", "!=": "not in",
+              "startswith": "startswith", "^": "startswith", "endswith": "endswith", "$": "endswith"}
+
+_CLAUSE = re.compile(r"^\s*(\w+)\s+(not\s+in|in|==|=|!=|startswith|endswith|\^|\$)\s+(.+?)\s*$", re.IGNORECASE)
+
+
+class Clause(NamedTuple):
+    field: str
+    op: str
+    values: tuple
+
+
+def parse_query(text: str):
+    """Parse the text form into clauses. Raises ValueError on malformed input."""
+    clauses = []
+    for part in re.split(r"\s+and\s+|\s*&\s*", text or "", flags=re.IGNORECASE):
+        if not part.strip():
+            continue
+        m = _CLAUSE.match(part)
+        if not m:
+            raise ValueError(f"cannot read '{part.strip()}'")
+        field, op, values = m.groups()
+        if field.lower() not in FIELD_ALIASES:
+            raise ValueError(f"unknown field '{field}' (use {', '.join(sorted(FIELD_ALIASES))})")
+        op = OP_ALIASES[re.sub(r"\s+", " ", op.lower())]
+        values = tuple(v.strip().lstrip("-") if op == "endswith" else v.strip() for v in values.split(","))
+        clauses.append(Clause(FIELD_ALIASES[field.lower()], op, tuple(v for v in values if v)))
+    return clauses
+
+
+def _text(label):
+    """Labels as query text: tones stored as floats (3.0) compare as '3'."""
+    if isinstance(label, float) and label.is_integer():
+        return str(int(label))
+    return str(label)
+
+
+def compile_query(bitmap, clauses, where=None):
+    """
+    Fold ``clauses`` into a bitmap filter (``{field: allowed labels}``),
+    intersecting with any labels already allowed by ``where``.
+    """
+    where = {d: list(v) for d, v in (where or {}).items()}
+    for clause in clauses:
+        if clause.field not in bitmap.index:
+            raise ValueError(f"field '{clause.field}' is not available in this dataset")
+        test = OPS[clause.op]
+        matched = [lab for lab in bitmap.index[clause.field] if test(_text(lab), clause.values)]
+        if clause.field in where:
+            allowed = set(matched)
+            matched = [lab for lab in where[clause.field] if lab in allowed]
+        where[clause.field] = matched
+    return where
+
+
+def query_rows(bitmap, clauses, where=None):
+    """Positions of the rows matching ``where`` AND every clause."""
+    return bitmap.rows(compile_query(bitmap, clauses, where))
@@ -0,0 +1,98 @@
+# project_verbs.py
+"""
+Place newly ingested verbs on the existing semantic map without re-running
+UMAP over the whole lexicon.
+
+New verbs need embedding vectors (``emb_0``, ``emb_1``, ... columns) from the
+same model as the existing layout. Their ``umap_x``/``umap_y`` are set by
+k-NN barycentric projection against the existing verbs' vectors, and the new
+rows are appended to the snapshot with those coordinates stored.
+
+Reference vectors for the existing verbs come from the snapshot itself or,
+if it does not ship them, from ``--reference`` (a CSV keyed by verb).
+
+Usage:
+  python project_verbs.py new_verbs.csv --out data/verbs_with_new.csv
+  python project_verbs.py new_verbs.csv --reference embeddings.csv --k 15 --out data/verbs_with_new.csv
+"""
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+from dataset import read_verbs
+from semantic import UMAP_COLS, embedding_cols, project_onto_layout
+
+DEFAULT_DATA = "data/two_char_verbs_with_Tr_Pro_with_UMAP.csv"
+
+
+def _verb_col(df):
+    return "Chinese_Verbs" if "Chinese_Verbs" in df.columns else "Verb"
+
+
+def project_new_verbs(existing: pd.DataFrame, new: pd.DataFrame, reference: pd.DataFrame = None, k: int = 10):
+    """
+    Return ``new`` with ``umap_x``/``umap_y`` projected onto ``existing``'s
+    layout. Verbs already in ``existing`` keep their stored position.
+    """
+    emb = embedding_cols(new)
+    if not emb:
+        raise ValueError("new verbs need embedding columns (emb_0, emb_1, ...)")
+    ex_verb, new_verb = _verb_col(existing), _verb_col(new)
+
+    ref = existing.dropna(subset=UMAP_COLS).drop_duplicates(subset=[ex_verb])
+    if reference is not None:
+        ref_emb = reference.rename(columns={_verb_col(reference): ex_verb})
+        ref = ref[[ex_verb] + UMAP_COLS].merge(ref_emb[[ex_verb] + emb], on=ex_verb)
+    missing = [c for c in emb if c not in ref.columns]
+    if missing:
+        raise ValueError("existing verbs have no embedding vectors; pass --reference")
+    ref = ref.dropna(subset=emb)
+    if ref.empty:
+        raise ValueError("no existing verbs with both a map position and an embedding")
+
+    out = new.copy()
+    xy = project_onto_layout(ref[emb].to_numpy(dtype=float), ref[UMAP_COLS].to_numpy(dtype=float),
+                             out[emb].to_numpy(dtype=float), k)
+    out["umap_x"], out["umap_y"] = xy[:, 0], xy[:, 1]
+    known = ref.set_index(ex_verb)[UMAP_COLS]
+    stored = out[new_verb].isin(known.index)
+    if stored.any():
+        out.loc[stored, UMAP_COLS] = known.loc[out.loc[stored, new_verb]].to_numpy()
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Project new verbs onto the existing semantic map.")
+    parser.add_argument("new", help="CSV of new verbs with emb_* columns")
+    parser.add_argument("--out", required=True, help="output snapshot (.csv or .parquet)")
+    parser.add_argument("--data", default=DEFAULT_DATA, help="existing verbs snapshot (CSV or Parquet)")
+    parser.add_argument("--reference", help="embeddings of the existing verbs, if the snapshot has none")
+    parser.add_argument("--k", type=int, default=10, help="neighbours used for each placement")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    existing = read_verbs(args.data)
+    new = pd.read_csv(args.new)
+    reference = pd.read_csv(args.reference) if args.reference else None
+    try:
+        placed = project_new_verbs(existing, new, reference, args.k)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Append only verbs the snapshot does not have yet, in its column layout
+    ex_verb = _verb_col(existing)
+    placed = placed.rename(columns={_verb_col(placed): ex_verb})
+    fresh = placed[~placed[ex_verb].isin(existing[ex_verb])]
+    merged = pd.concat([existing, fresh.reindex(columns=existing.columns)], ignore_index=True)
+    if args.out.endswith(".parquet"):
+        merged.to_parquet(args.out, index=False)
+    else:
+        merged.to_csv(args.out, index=False)
+    print(f"Placed {len(placed)} verbs ({len(fresh)} new) in {time.perf_counter() - t0:.2f}s -> {args.out}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
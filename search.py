@@ -0,0 +1,247 @@
+# search.py
+"""
+Search over verbs and characters.
+
+An inverted index maps terms to verb ids, one table per field: the verb
+and its characters, full pinyin with and without tone digits, single
+syllables with and without tones, and the words of ``English_Verb``.
+Characters are indexed by hanzi and reading. Every query token must match
+some field of a hit:
+
+- exact terms are dictionary lookups;
+- the last token also matches as a prefix (search-as-you-type), through a
+  sorted term list that serves as a flattened trie;
+- English tokens with no exact or prefix match fall back to words within
+  one or two edits, found through a symmetric-delete table (SymSpell).
+
+Postings are int arrays and scores are accumulated in one array per query,
+so a lookup costs a few array operations however common the terms are.
+"""
+import bisect
+import re
+import unicodedata
+from collections import defaultdict
+from typing import NamedTuple
+
+import numpy as np
+
+_HANZI = re.compile(r"[㐀-鿿豈-﫿]")
+_TOKEN = re.compile(r"[㐀-鿿豈-﫿]+|[a-z0-9']+")
+_SYLLABLE = re.compile(r"[a-z]+[1-5]?")
+_WORD = re.compile(r"[a-z0-9']+")
+_MARKS = "[\u0300-\u036f]"
+
+# Score of a token matching a field exactly / as a prefix / within a few edits
+EXACT = {"verb": 10, "char": 5, "pinyin": 10, "pinyin_bare": 9, "syllable": 6, "syllable_bare": 5, "english": 5}
+PREFIX = {"pinyin": 4, "pinyin_bare": 4, "syllable": 3, "syllable_bare": 3, "english": 3}
+FUZZY = {1: 2.0, 2: 1.5}
+# Completions expanded per prefix, in term order
+PREFIX_TERMS = 32
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+class Hit(NamedTuple):
+    kind: str   # "verb" or "char"
+    key: str
+    label: str
+    score: float
+
+
+def normalize_pinyin(text):
+    """Lowercase with ü written as v and tone marks dropped (tone digits are kept)."""
+    text = unicodedata.normalize("NFD", str(text).lower()).replace("u\u0308", "v").replace("u:", "v")
+    return re.sub(_MARKS, "", text)
+
+
+def _bare(term):
+    return re.sub(r"[1-5]", "", term)
+
+
+def _max_edits(word):
+    return 0 if len(word) < 3 else 1 if len(word) < 8 else 2
+
+
+def _deletes(word, d):
+    """All strings reachable from ``word`` by up to ``d`` deletions."""
+    out, frontier = {word}, {word}
+    for _ in range(d):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        out |= frontier
+    return out
+
+
+def _edit_distance(a, b, limit):
+    """
+    Edit distance counting an adjacent transposition as one edit (optimal
+    string alignment), or ``limit + 1`` once it is known to exceed ``limit``.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, prev = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cur[j] = min(cur[j], before[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        before, prev = prev, cur
+    return prev[-1]
+
+
+class _Field:
+    """Term → id array table with a sorted term list for prefix lookups."""
+
+    def __init__(self, pairs):
+        postings = defaultdict(set)
+        for term, i in pairs:
+            if term:
+                postings[term].add(i)
+        self.postings = {t: np.array(sorted(ids), dtype=np.int32) for t, ids in postings.items()}
+        self.terms = sorted(self.postings)
+
+    def exact(self, term):
+        return self.postings.get(term, _EMPTY)
+
+    def prefix(self, term):
+        lo = bisect.bisect_left(self.terms, term)
+        hi = bisect.bisect_left(self.terms, term + "￿", lo)
+        found = [self.postings[t] for t in self.terms[lo:min(hi, lo + PREFIX_TERMS)]]
+        return np.concatenate(found) if found else _EMPTY
+
+
+class SearchIndex:
+    """Ranked search over the distinct verbs of a table and their characters."""
+
+    def __init__(self, df, verb_col="Verb"):
+        verbs = df.drop_duplicates(subset=[verb_col])
+        self.verbs = verbs[verb_col].astype(str).tolist()
+        n = len(self.verbs)
+        pinyin = verbs["pinyin"].fillna("").astype(str).str.lower().str.normalize("NFD") \
+            .str.replace("u\u0308", "v").str.replace("u:", "v").str.replace(_MARKS + "| ", "", regex=True).tolist() \
+            if "pinyin" in verbs.columns else [""] * n
+        english = verbs["English_Verb"].fillna("").astype(str).tolist() if "English_Verb" in verbs.columns else [""] * n
+        syllables = [_SYLLABLE.findall(p) for p in pinyin]
+        hanzi = [_HANZI.findall(v) for v in self.verbs]
+        words = [_WORD.findall(e.lower()) for e in english]
+
+        self.verb_fields = {
+            "verb": _Field((v, i) for i, v in enumerate(self.verbs)),
+            "char": _Field((ch, i) for i, chars in enumerate(hanzi) for ch in chars),
+            "pinyin": _Field((p, i) for i, p in enumerate(pinyin)),
+            "pinyin_bare": _Field((_bare(p), i) for i, p in enumerate(pinyin)),
+            "syllable": _Field((s, i) for i, syls in enumerate(syllables) for s in syls),
+            "syllable_bare": _Field((_bare(s), i) for i, syls in enumerate(syllables) for s in syls),
+            "english": _Field((w, i) for i, ws in enumerate(words) for w in ws),
+        }
+        self._verb_labels = [f"{v} ({p}) — {e}" if e else f"{v} ({p})" if p else v
+                             for v, p, e in zip(self.verbs, pinyin, english)]
+        # Equal scores rank shorter glosses first; the offset stays below the smallest score step
+        order = sorted(range(n), key=lambda i: (len(english[i]), self.verbs[i]))
+        self._verb_tiebreak = np.empty(n)
+        self._verb_tiebreak[order] = 0.4 * np.arange(n) / max(n, 1)
+
+        readings = defaultdict(set)
+        for chars, syls in zip(hanzi, syllables):
+            for k, ch in enumerate(chars):
+                if len(chars) == len(syls):
+                    readings[ch].add(syls[k])
+                else:
+                    readings[ch]
+        self.chars = sorted(readings)
+        self.char_fields = {
+            "char": _Field((ch, i) for i, ch in enumerate(self.chars)),
+            "syllable": _Field((s, i) for i, ch in enumerate(self.chars) for s in readings[ch]),
+            "syllable_bare": _Field((_bare(s), i) for i, ch in enumerate(self.chars) for s in readings[ch]),
+        }
+        self._char_labels = [f"{ch} ({', '.join(sorted(readings[ch]))})" if readings[ch] else ch for ch in self.chars]
+        self._char_tiebreak = 0.4 * np.arange(len(self.chars)) / max(len(self.chars), 1)
+
+        # Symmetric-delete table for typo-tolerant English lookups (words only, not numbers)
+        self._english_deletes = defaultdict(set)
+        for word in filter(str.isalpha, self.verb_fields["english"].terms):
+            for variant in _deletes(word, _max_edits(word)):
+                self._english_deletes[variant].add(word)
+
+    def _fuzzy_english(self, token):
+        """(ids, scores) of verbs with an English word within a few edits of ``token``."""
+        d = _max_edits(token)
+        candidates = set()
+        for variant in _deletes(token, d) if d else ():
+            candidates |= self._english_deletes.get(variant, set())
+        ids, scores = [], []
+        for word in candidates:
+            dist = _edit_distance(token, word, d)
+            if 0 < dist <= d:
+                found = self.verb_fields["english"].postings[word]
+                ids.append(found)
+                scores.append(np.full(len(found), FUZZY[dist]))
+        return (np.concatenate(ids), np.concatenate(scores)) if ids else (_EMPTY, np.empty(0))
+
+    def _token_scores(self, fields, n, token, last):
+        """Best score per id (0 = no match) for one query token."""
+        scores = np.zeros(n)
+        if _HANZI.match(token):
+            exact = fields["verb"].exact(token) if "verb" in fields else _EMPTY
+            scores[exact] = EXACT["verb"]
+            # Otherwise every character of the token must occur in the hit
+            if not len(exact):
+                inside = np.full(n, EXACT["char"])
+                for ch in token:
+                    hit = np.zeros(n, dtype=bool)
+                    hit[fields["char"].exact(ch)] = True
+                    inside[~hit] = 0
+                scores = np.maximum(scores, inside)
+            return scores
+
+        for name, field in fields.items():
+            if name in ("verb", "char"):
+                continue
+            term = _bare(token) if name.endswith("_bare") else token
+            ids = field.exact(term)
+            scores[ids] = np.maximum(scores[ids], EXACT[name])
+            if last:
+                ids = field.prefix(term)
+                scores[ids] = np.maximum(scores[ids], PREFIX[name])
+        if "english" in fields and not scores.any():
+            ids, fuzzy = self._fuzzy_english(token)
+            np.maximum.at(scores, ids, fuzzy)
+        return scores
+
+    def _rank(self, fields, n, tokens, tiebreak, limit):
+        total = np.zeros(n)
+        for k, token in enumerate(tokens):
+            scores = self._token_scores(fields, n, token, k == len(tokens) - 1)
+            total = np.where(scores > 0, total + scores, 0) if k else scores
+        found = np.flatnonzero(total)
+        if len(found) > limit:
+            key = total[found] - tiebreak[found]
+            found = found[np.argpartition(-key, limit - 1)[:limit]]
+        found = found[np.argsort(tiebreak[found] - total[found], kind="stable")]
+        return found, total[found]
+
+    def search(self, query, limit=10, kinds=("verb", "char")):
+        """Ranked hits for ``query``, best first (verbs before characters on equal scores)."""
+        tokens = _TOKEN.findall(normalize_pinyin(query))
+        if not tokens or limit <= 0:
+            return []
+        hits = []
+        if "verb" in kinds and self.verbs:
+            ids, scores = self._rank(self.verb_fields, len(self.verbs), tokens, self._verb_tiebreak, limit)
+            hits += [Hit("verb", self.verbs[i], self._verb_labels[i], float(s)) for i, s in zip(ids, scores)]
+        if "char" in kinds and self.chars:
+            # Characters match on hanzi (one token per character) and readings, not on English
+            char_tokens = [ch for t in tokens for ch in (t if _HANZI.match(t) else [t])]
+            if all(_HANZI.match(t) or _SYLLABLE.fullmatch(t) for t in char_tokens):
+                ids, scores = self._rank(self.char_fields, len(self.chars), char_tokens, self._char_tiebreak, limit) \
+                    if len(char_tokens) == 1 else self._any_chars(char_tokens, limit)
+                hits += [Hit("char", self.chars[i], self._char_labels[i], float(s)) for i, s in zip(ids, scores)]
+        hits.sort(key=lambda h: (-h.score, h.kind != "verb"))
+        return hits[:limit]
+
+    def _any_chars(self, tokens, limit):
+        """Several hanzi typed at once: each known character is a hit, in query order."""
+        ids = [self.char_fields["char"].exact(t) for t in tokens if _HANZI.match(t)]
+        ids = list(dict.fromkeys(int(i) for found in ids for i in found))[:limit]
+        return ids, [EXACT["char"]] * len(ids)
@@ -0,0 +1,135 @@
+# semantic.py
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+UMAP_COLS = ["umap_x", "umap_y"]
+# Embedding vectors, when a snapshot ships them, are stored as emb_0, emb_1, ...
+EMBEDDING_PREFIX = "emb_"
+INFO_COLS = ["Verb", "pinyin", "English_Verb", "verb_type"]
+
+
+def embedding_cols(df):
+    """Embedding columns in dimension order (empty if the snapshot has none)."""
+    cols = [c for c in df.columns if c.startswith(EMBEDDING_PREFIX) and c[len(EMBEDDING_PREFIX):].isdigit()]
+    return sorted(cols, key=lambda c: int(c[len(EMBEDDING_PREFIX):]))
+
+
+class SemanticIndex:
+    """
+    KD-trees over the verb map, one row per distinct verb.
+
+    The ``umap`` space uses the 2-D layout shown on the semantic map. The
+    ``embedding`` space, present only when the snapshot ships ``emb_*``
+    columns, uses the L2-normalised vectors, so Euclidean ranking there
+    equals cosine ranking. Every query accepts one verb or a list of verbs
+    and runs as a single vectorised tree lookup.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        verbs = df.dropna(subset=UMAP_COLS).drop_duplicates(subset=["Verb"])
+        self.verbs = verbs[[c for c in INFO_COLS if c in verbs.columns]].reset_index(drop=True)
+        self._info = {c: self.verbs[c].to_numpy() for c in self.verbs.columns}
+        self.verb_pos = {v: i for i, v in enumerate(self.verbs["Verb"])}
+        self.points = {"umap": verbs[UMAP_COLS].to_numpy(dtype=float)}
+        emb = embedding_cols(verbs)
+        if emb:
+            self.points["embedding"] = _unit(verbs[emb].to_numpy(dtype=float))
+        self.trees = {space: cKDTree(points) for space, points in self.points.items()}
+
+    @property
+    def spaces(self):
+        return list(self.trees)
+
+    def positions(self, verbs):
+        """Index positions of ``verbs`` (unknown verbs are dropped)."""
+        verbs = [verbs] if isinstance(verbs, str) else verbs
+        return np.array([self.verb_pos[v] for v in verbs if v in self.verb_pos], dtype=np.int64)
+
+    def nearest(self, verbs, k=10, space="umap"):
+        """
+        Top-``k`` neighbours of each query verb, excluding the verb itself.
+        Returns one row per (query, rank) with the neighbour and its distance.
+        """
+        pos = self.positions(verbs)
+        k = min(int(k), len(self.verbs) - 1)
+        if len(pos) == 0 or k <= 0:
+            return self._table(pos[:0], np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=np.int64))
+        # Ask for one extra so the query point can be dropped even on ties
+        dist, idx = self.trees[space].query(self.points[space][pos], k=k + 1)
+        keep = idx != pos[:, None]
+        keep &= np.cumsum(keep, axis=1) <= k
+        rows = np.nonzero(keep)
+        ranks = np.cumsum(keep, axis=1)[rows]
+        return self._table(pos[rows[0]], idx[rows], dist[rows], ranks)
+
+    def within(self, verbs, radius, space="umap"):
+        """All verbs within ``radius`` of each query verb, nearest first."""
+        pos = self.positions(verbs)
+        points = self.points[space]
+        hits = self.trees[space].query_ball_point(points[pos], r=radius) if len(pos) else []
+        q, j = [], []
+        for p, found in zip(pos, hits):
+            found = [f for f in found if f != p]
+            q.extend([p] * len(found))
+            j.extend(found)
+        q, j = np.asarray(q, dtype=np.int64), np.asarray(j, dtype=np.int64)
+        dist = np.linalg.norm(points[q] - points[j], axis=1) if len(q) else np.empty(0)
+        order = np.lexsort((dist, q))
+        q, j, dist = q[order], j[order], dist[order]
+        ranks = np.ones(len(q), dtype=np.int64)
+        if len(q):
+            starts = np.r_[0, np.flatnonzero(np.diff(q)) + 1]
+            ranks = np.arange(len(q)) - np.repeat(starts, np.diff(np.r_[starts, len(q)])) + 1
+        return self._table(q, j, dist, ranks)
+
+    def project(self, vectors, k=10):
+        """Layout coordinates for new embedding vectors (see ``project_onto_layout``)."""
+        if "embedding" not in self.points:
+            raise ValueError("this snapshot has no embedding columns to project against")
+        return project_onto_layout(self.points["embedding"], self.points["umap"], vectors, k)
+
+    def _table(self, q, j, dist, ranks):
+        out = {"query": self._info["Verb"][q], "rank": np.asarray(ranks, dtype=np.int64)}
+        out.update({c: values[j] for c, values in self._info.items()})
+        out["distance"] = np.asarray(dist, dtype=float)
+        return pd.DataFrame(out)
+
+
+def density_grid(x, y, x_range, y_range, bins=150):
+    """
+    Server-side 2-D binning of map points for the density view: returns
+    ``(counts, x_centers, y_centers)`` with ``counts`` shaped (y, x) as
+    ``go.Heatmap`` expects. The payload is ``bins²`` cells whatever the
+    number of points.
+    """
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins, range=[x_range, y_range])
+    return counts.T, (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2
+
+
+def project_onto_layout(ref_vectors, ref_xy, new_vectors, k=10):
+    """
+    Place new verbs on an existing 2-D layout by k-NN barycentric projection.
+
+    Each new vector is located among the reference vectors (cosine distance
+    via L2-normalised vectors), and its position is the inverse-distance
+    weighted mean of its ``k`` nearest references' layout coordinates. An
+    exact match lands on its reference. Returns an ``(n_new, 2)`` array.
+    """
+    ref = _unit(np.asarray(ref_vectors, dtype=float))
+    new = _unit(np.asarray(new_vectors, dtype=float))
+    ref_xy = np.asarray(ref_xy, dtype=float)
+    k = min(int(k), len(ref))
+    dist, idx = cKDTree(ref).query(new, k=k)
+    dist, idx = dist.reshape(len(new), k), idx.reshape(len(new), k)
+    weights = 1.0 / np.maximum(dist, 1e-12)
+    exact = dist[:, 0] <= 1e-12
+    weights[exact] = 0
+    weights[exact, 0] = 1
+    weights /= weights.sum(axis=1, keepdims=True)
+    return np.einsum("nk,nkd->nd", weights, ref_xy[idx])
+
+
+def _unit(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
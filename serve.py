@@ -0,0 +1,29 @@
+# serve.py
+"""
+Run the app with its caches warmed at process start.
+
+Starts the warm-up thread (see ``warmup.py``) and then the Streamlit server
+on the Home page, so the default views are computed while the server comes
+up instead of on the first visit. Options are passed on to ``streamlit run``.
+
+Usage:
+  python serve.py --server.port 8501 --server.headless true
+"""
+import os
+import sys
+
+from streamlit.web import cli as stcli
+
+import warmup
+
+HOME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "🏠_Home.py")
+
+
+def main():
+    warmup.start()
+    sys.argv = ["streamlit", "run", HOME, *sys.argv[1:]]
+    sys.exit(stcli.main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# tests/test_coverage.py
+"""CoverageEngine against the original page's greedy loop and a brute-force optimum."""
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from coverage import KNOWN, CoverageEngine, coverage_curve
+
+
+def reference_greedy(edges, k_max):
+    """The Coverage Optimizer's loop before CoverageEngine, verbatim apart from the arguments."""
+    edges = edges.copy()
+    edges["edge_id"] = edges["char1"] + "|" + edges["char2"]
+    uncovered = set(edges["edge_id"])
+    selected = []
+    while len(selected) < k_max and uncovered:
+        counts = {}
+        for _, r in edges.iterrows():
+            eid = r["edge_id"]
+            if eid not in uncovered:
+                continue
+            for ch in (r["char1"], r["char2"]):
+                counts[ch] = counts.get(ch, 0) + 1
+        if not counts:
+            break
+        best = max(counts.items(), key=lambda kv: kv[1])[0]
+        selected.append(best)
+        newly = edges[(edges["char1"] == best) | (edges["char2"] == best)]["edge_id"].tolist()
+        uncovered -= set(newly)
+    return selected, set(edges["edge_id"]) - uncovered
+
+
+def random_edges(rng, n_chars, n_edges):
+    """Random edges over a small alphabet: many ties, self-loops and repeated pairs."""
+    chars = np.array([chr(0x4e00 + i) for i in range(n_chars)])
+    return pd.DataFrame({"char1": chars[rng.integers(0, n_chars, n_edges)],
+                         "char2": chars[rng.integers(0, n_chars, n_edges)]})
+
+
+def marginal_gains(engine, covered):
+    """Uncovered weight each character would add, self-loops counted once."""
+    return np.array([engine.weights[~covered & ((engine.src == c) | (engine.dst == c))].sum()
+                     for c in range(len(engine.chars))])
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_greedy_matches_original_loop(seed):
+    rng = np.random.default_rng(seed)
+    edges = random_edges(rng, int(rng.integers(2, 12)), int(rng.integers(1, 40)))
+    k_max = int(rng.integers(1, 15))
+    selected, covered = reference_greedy(edges, k_max)
+
+    engine = CoverageEngine(edges["char1"], edges["char2"])
+    picks, edge_rank = engine.greedy(k_max)
+    assert engine.chars[picks].tolist() == selected
+    assert set((edges["char1"] + "|" + edges["char2"])[edge_rank >= 0]) == covered
+
+
+def test_greedy_tie_and_self_loop_order():
+    # Unit weights: the self-loop 甲→甲 counts twice, as in the original loop
+    # and wins the tie with 乙 by appearing first
+    edges = pd.DataFrame({"char1": ["甲", "乙", "乙"], "char2": ["甲", "丙", "丁"]})
+    engine = CoverageEngine(edges["char1"], edges["char2"])
+    picks, _ = engine.greedy()
+    assert engine.chars[picks].tolist() == reference_greedy(edges, 10)[0] == ["甲", "乙"]
+
+    # Other weights count it once, like the objective: 乙 covers more
+    engine = CoverageEngine(edges["char1"], edges["char2"], [2.0, 2.0, 2.0])
+    picks, _ = engine.greedy()
+    assert engine.chars[picks].tolist() == ["乙", "甲"]
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_weighted_greedy_takes_the_best_marginal_gain(seed):
+    rng = np.random.default_rng(seed)
+    edges = random_edges(rng, int(rng.integers(2, 8)), int(rng.integers(3, 25)))
+    weights = rng.random(len(edges)) * (rng.random(len(edges)) < 0.7)
+    engine = CoverageEngine(edges["char1"], edges["char2"], weights)
+    picks, edge_rank = engine.greedy()
+
+    covered = np.zeros(len(edges), dtype=bool)
+    for c in picks:
+        gains = marginal_gains(engine, covered)
+        assert gains[c] == pytest.approx(gains.max())
+        assert gains[c] > 0
+        covered |= (engine.src == c) | (engine.dst == c)
+    assert marginal_gains(engine, covered).max() == 0
+    assert coverage_curve(picks, edge_rank, weights)[-1] == pytest.approx(engine.objective(picks))
+
+
+def test_greedy_known_seed():
+    edges = pd.DataFrame({"char1": ["甲", "甲", "乙", "丙"], "char2": ["乙", "丙", "丁", "丁"]})
+    engine = CoverageEngine(edges["char1"], edges["char2"])
+    picks, edge_rank = engine.greedy(known=engine.codes(["甲"]))
+    assert engine.char_index["甲"] not in picks
+    assert (edge_rank[:2] == KNOWN).all()
+    assert (edge_rank[2:] >= 0).all()
+
+
+@pytest.mark.parametrize("seed", range(150))
+def test_exact_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    edges = random_edges(rng, int(rng.integers(2, 9)), int(rng.integers(1, 20)))
+    weights = rng.integers(0, 4, len(edges)).astype(float) if seed % 2 else None
+    engine = CoverageEngine(edges["char1"], edges["char2"], weights)
+    n = len(engine.chars)
+    k = int(rng.integers(1, n + 1))
+    known = engine.codes(edges["char1"].iloc[:1]) if seed % 3 == 0 else []
+
+    candidates = [c for c in range(n) if c not in known]
+    best = max(engine.objective(combo, known) for combo in combinations(candidates, min(k, len(candidates))))
+    greedy_picks, _ = engine.greedy(k, known=known)
+    res = engine.exact(k, known=known, time_limit=60, incumbent=greedy_picks)
+
+    assert res["optimal"]
+    assert res["value"] == pytest.approx(best)
+    assert res["bound"] == pytest.approx(best)
+    assert len(res["picks"]) <= k
+    assert engine.objective(res["picks"], known) == pytest.approx(res["value"])
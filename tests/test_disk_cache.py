@@ -0,0 +1,46 @@
+# tests/test_disk_cache.py
+import os
+import random
+
+from disk_cache import MISSING, DiskCache, key_digest
+
+MAX_BYTES = 20000
+
+
+def test_round_trip_and_shared_blobs(tmp_path):
+    store = DiskCache(str(tmp_path / "cache.sqlite"), MAX_BYTES)
+    assert store.get(key_digest(("f", 1))) is MISSING
+    value = {"picks": ["甲", "乙"], "value": 2.0}
+    assert store.put(key_digest(("f", 1)), "f", "v1", value)
+    assert store.put(key_digest(("g", 1)), "g", "v1", dict(value))
+    assert store.get(key_digest(("f", 1))) == value
+    assert store.stats()["keys"] == 2 and store.stats()["blobs"] == 1
+
+
+def test_unpicklable_and_oversized_values_are_skipped(tmp_path):
+    store = DiskCache(str(tmp_path / "cache.sqlite"), MAX_BYTES)
+    assert not store.put("a", "f", "v1", lambda: None)
+    assert not store.put("b", "f", "v1", os.urandom(2 * MAX_BYTES))
+    assert store.stats()["keys"] == 0
+
+
+def test_eviction_keeps_the_store_bounded(tmp_path):
+    # Many keys share a few blobs, so dropping a key often frees nothing
+    rng = random.Random(1)
+    blobs = [os.urandom(1000) for _ in range(30)]
+    store = DiskCache(str(tmp_path / "cache.sqlite"), MAX_BYTES)
+    for i in range(300):
+        store.put(f"k{i}", "f", "v1", rng.choice(blobs))
+        assert store.stats()["bytes"] <= MAX_BYTES
+    assert store.get("k299") is not MISSING
+    assert store.get("k0") is MISSING
+
+
+def test_clear_by_version(tmp_path):
+    store = DiskCache(str(tmp_path / "cache.sqlite"), MAX_BYTES)
+    store.put("a", "f", "v1", 1)
+    store.put("b", "f", "v2", 2)
+    store.clear("v1")
+    assert store.get("a") is MISSING and store.get("b") == 2
+    store.clear()
+    assert store.stats() == {"keys": 0, "blobs": 0, "bytes": 0}
@@ -0,0 +1,94 @@
+# tests/test_indexes.py
+"""BitmapIndex, CountCube, minimal_pair_table and SearchIndex against plain pandas."""
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bitmap import BitmapIndex
+from cube import CountCube
+from minpairs import minimal_pair_table
+from search import SearchIndex
+
+
+def random_frame(rng, n):
+    return pd.DataFrame({
+        "tone": rng.choice(["1-2", "3-4", "4-4", None], n),
+        "cls": rng.choice(["a", "b", "c"], n),
+        "src": rng.integers(1, 5, n),
+        "w": rng.random(n),
+    })
+
+
+def isin_mask(frame, where):
+    mask = np.ones(len(frame), dtype=bool)
+    for d, values in where.items():
+        mask &= frame[d].isin(values).to_numpy()
+    return mask
+
+
+WHERES = [None, {}, {"tone": ["1-2"]}, {"tone": ["3-4", "4-4"], "cls": ["b"]},
+          {"cls": []}, {"tone": ["9-9"]}, {"src": [1, 3], "cls": ["a", "c"]}]
+
+
+@pytest.mark.parametrize("n", [0, 1, 63, 64, 65, 500])
+@pytest.mark.parametrize("where", WHERES)
+def test_bitmap_matches_isin(n, where):
+    frame = random_frame(np.random.default_rng(n), n)
+    index = BitmapIndex(frame, ["tone", "cls", "src"])
+    expected = isin_mask(frame, where or {})
+    assert (index.mask(where) == expected).all()
+    assert index.count(where) == expected.sum()
+    assert index.rows(where).tolist() == np.flatnonzero(expected).tolist()
+
+
+@pytest.mark.parametrize("where", WHERES)
+def test_cube_matches_groupby(where):
+    frame = random_frame(np.random.default_rng(7), 300)
+    cube = CountCube(frame, ["tone", "cls", "src"])
+    weighted = CountCube(frame, ["tone", "cls", "src"], weight="w")
+    rows = frame[isin_mask(frame, where or {})]
+
+    expected = rows.groupby(["tone", "cls"]).size().unstack(fill_value=0)
+    got = cube.frame("tone", "cls", where)
+    assert (got.reindex_like(expected).fillna(0) == expected).all().all()
+    assert got.to_numpy().sum() == len(rows.dropna(subset=["tone"]))
+
+    expected_w = rows.groupby("src")["w"].sum()
+    assert np.allclose(weighted.series("src", where).reindex(expected_w.index), expected_w)
+
+
+def test_minimal_pairs_match_brute_force():
+    rng = np.random.default_rng(3)
+    bases = rng.choice(["ma", "shi", "zhi", "yi"], 60)
+    src, dst = rng.integers(1, 5, 60), rng.integers(1, 5, 60)
+    df = pd.DataFrame({
+        "Verb": [f"v{i}" for i in range(60)], "pinyin": [f"{b}{s}{b}{d}" for b, s, d in zip(bases, src, dst)],
+        "pinyin_base": bases, "tone_pattern": [f"{s}-{d}" for s, d in zip(src, dst)],
+        "English_Verb": "x", "src_tone": src, "dst_tone": dst,
+    })
+    reps = df.drop_duplicates(subset=["pinyin_base", "tone_pattern"])
+    expected = {(a.Verb, b.Verb) for (_, a), (_, b) in combinations(reps.iterrows(), 2)
+                if a.pinyin_base == b.pinyin_base}
+
+    pairs = minimal_pair_table(df)
+    assert set(zip(pairs["A_Verb"], pairs["B_Verb"])) == expected
+    assert len(pairs) == len(expected)
+    assert (pairs["any_differs"]).all()
+    assert (pairs["src_differs"] == (pairs["A_tone"].str[0] != pairs["B_tone"].str[0])).all()
+
+
+def test_search_exact_prefix_and_fuzzy():
+    df = pd.DataFrame({
+        "Verb": ["学习", "学生", "打开", "打算"],
+        "pinyin": ["xue2xi2", "xue2sheng1", "da3kai1", "da3suan4"],
+        "English_Verb": ["study", "student", "open", "plan"],
+    })
+    index = SearchIndex(df)
+    assert index.search("学习")[0].key == "学习"
+    assert index.search("xue2 xi2")[0].key == "学习"
+    assert {h.key for h in index.search("da", kinds=("verb",))} == {"打开", "打算"}
+    assert index.search("opne", kinds=("verb",))[0].key == "打开"
+    assert index.search("学", kinds=("char",))[0].key == "学"
+    assert index.search("") == []
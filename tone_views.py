@@ -0,0 +1,221 @@
+# tone_views.py
+"""
+Tone Patterns builders: the per-version rows, edge table and indexes, the
+tone graph with its families, minimal pairs and character profiles, and the
+rendered pyvis pages. The page reads them; ``warmup`` calls them with the
+page's default filters.
+
+Dataset-level results are named so the analytics bundle can preload them;
+rendered pages are keyed on the filter key.
+"""
+import networkx as nx
+import streamlit as st
+from pyvis.network import Network
+
+import analytics
+from bitmap import BitmapIndex
+from compute_cache import computed, filter_key, publish, table
+from dataset import CLASS_CODE_COL, VerbIndex, class_names, option_lists, prepare_tones
+from deck_sampling import EdgeIndex
+from minpairs import PhoneticIndex, minimal_pair_table
+from phonetic_query import QUERY_FIELDS
+from search import SearchIndex
+
+# Color map for tone pairs
+PALETTE = ["#1f77b4","#ff7f0e","#2ca02c","#d62728","#9467bd","#8c564b","#e377c2","#7f7f7f","#bcbd22","#17becf",
+           "#393b79","#637939","#8c6d31","#843c39","#7b4173","#3182bd","#e6550d","#31a354","#756bb1","#636363"]
+
+
+@st.cache_resource
+def tone_tables(version, _raw):
+    """Prepared rows and the weighted edge table, once per dataset version (read-only)."""
+    return prepare_tones(_raw.copy())
+
+
+@computed
+def class_labels(version, lang):
+    """Class code → name in ``lang``."""
+    return class_names(table(version, 'tone_rows'), lang)
+
+
+@computed(name='tones.graph')
+def build_graph(version):
+    """Full tone graph from the edge table published for the dataset version."""
+    return analytics.tone_graph(table(version, 'tone_edges'))
+
+
+@st.cache_resource
+def get_edge_index(version, _edge_df):
+    """Char/pair codes for the edge table, once per dataset version (read-only)."""
+    return EdgeIndex(_edge_df)
+
+
+@st.cache_resource
+def get_filter_bitmap(version, _edge_df):
+    """Per-value edge bitsets for the sidebar filters and phonetic queries, once per dataset version."""
+    dims = [c for c in QUERY_FIELDS if c in _edge_df.columns] + ([CLASS_CODE_COL] if CLASS_CODE_COL in _edge_df.columns else [])
+    return BitmapIndex(_edge_df, dims)
+
+
+@st.cache_resource
+def get_verb_index(version, _df):
+    """Verb and character → row lookups on the prepared rows, once per dataset version."""
+    return VerbIndex(_df)
+
+
+@st.cache_data
+def get_options(version, _df):
+    """Option lists for the widgets, once per dataset version."""
+    return option_lists(_df)
+
+
+@st.cache_resource
+def get_search_index(version, _df):
+    """Hanzi/pinyin/English search index, once per dataset version."""
+    return SearchIndex(_df)
+
+
+@computed(name='tones.minimal_pairs')
+def get_minimal_pairs(version):
+    """All minimal tone-contrast pairs with contrast flags, once per dataset version."""
+    return minimal_pair_table(table(version, 'tone_rows'))
+
+
+@computed(name='tones.families')
+def get_families(version):
+    """
+    Character families (large communities of the full graph) and a weighted
+    family × tone pair × src × dst cube of their intra-family edges, once per
+    dataset version.
+    """
+    return analytics.tone_families(build_graph(version), table(version, 'tone_edges'))
+
+
+@computed(name='tones.char_profiles')
+def get_char_profiles(version):
+    """Character × position × tone counts, once per dataset version."""
+    return {'profiles': analytics.char_profiles(table(version, 'tone_rows'))}
+
+
+@st.cache_resource
+def get_phonetic_index(version, _df):
+    """Blocking-key index for near-minimal pairs, once per dataset version (read-only)."""
+    return PhoneticIndex(_df)
+
+
+@st.cache_data
+def get_near_pairs(version, d, _df):
+    return get_phonetic_index(version, _df).near_pairs(d)
+
+
+def publish_tables(version, raw):
+    """Prepare and publish the rows, edges and filter bitsets the builders read; returns ``(rows, edges)``."""
+    df, edge_df = tone_tables(version, raw)
+    publish(version, 'tone_rows', df)
+    publish(version, 'tone_edges', edge_df)
+    publish(version, 'tone_filter_bitmap', get_filter_bitmap(version, edge_df))
+    return df, edge_df
+
+
+@computed
+def pair_colors(version):
+    """Tone pair → palette colour, in option order."""
+    unique_pairs = get_options(version, table(version, 'tone_rows'))['tones']
+    return {tp: PALETTE[i % len(PALETTE)] for i, tp in enumerate(unique_pairs)}
+
+
+@computed
+def network_html(version, where, fade_unselected):
+    """Pyvis page of the tone network; edges outside the filter are faded (or dropped)."""
+    edge_df = table(version, 'tone_edges')
+    mask = table(version, 'tone_filter_bitmap').mask(dict(where))
+    pair_color = pair_colors(version)
+    G = nx.DiGraph()
+    for _, r in edge_df.iterrows():
+        # include all nodes for layout stability
+        if r['char1'] not in G:
+            G.add_node(r['char1'])
+        if r['char2'] not in G:
+            G.add_node(r['char2'])
+    # Visibility follows the shared tone and class filters
+    for show, (_, r) in zip(mask, edge_df.iterrows()):
+        # Add edges regardless (to allow fading), but mark visibility
+        G.add_edge(r['char1'], r['char2'],
+                   tone_pair=r['tone_pattern'], src_tone=int(r['src_tone']), dst_tone=int(r['dst_tone']),
+                   weight=int(r['weight']),
+                   verb=r.get('Verb'), pinyin=r.get('pinyin'), english=r.get('English_Verb'),
+                   cls_zh=r.get('Classification_zh'), cls_en=r.get('Classification_en'),
+                   visible=bool(show))
+
+    degrees = dict(G.degree())
+    min_d, max_d = (0, 1)
+    if degrees:
+        min_d = min(degrees.values()); max_d = max(degrees.values()) if max(degrees.values())>0 else 1
+    size_scale = {n: 12 + 24*(deg-min_d)/(max_d-min_d) if (max_d-min_d)>0 else 15 for n, deg in degrees.items()}
+
+    net = Network(height='750px', width='100%', notebook=False, directed=True, cdn_resources='in_line', select_menu=True, filter_menu=True)
+    # Node groups by dominant tone for simple coloring when grouping in menu
+    node_tone = nx.get_node_attributes(G, 'tone')
+    for n in G.nodes():
+        tone = node_tone.get(n, None)
+        net.add_node(n, label=n, size=size_scale.get(n, 15), font={'size': int(size_scale.get(n, 15))+8}, group=str(tone) if tone else 'N/A')
+
+    for u, v, d in G.edges(data=True):
+        color = pair_color.get(d['tone_pair'], '#cccccc')
+        width = 1 + (d.get('weight',1))
+        # Fade if not selected
+        if not d.get('visible'):
+            if fade_unselected:
+                color = '#dddddd'
+                width = 1
+            else:
+                continue
+        title = f"{d.get('verb','')} ({d.get('pinyin','')})\n{d.get('english','')}\n{u}→{v}  [{d.get('tone_pair','')}]"
+        net.add_edge(u, v, title=title, color=color, width=width)
+    return net.generate_html()
+
+
+@computed
+def family_html(version, where, idx):
+    """Pyvis page of family ``idx``'s intra-family edges under a tone filter key."""
+    edge_df = table(version, 'tone_edges')
+    C = get_families(version)[0][idx]
+    pair_color = pair_colors(version)
+    # Subset edges to intra-community + current tone filters
+    sub = edge_df[table(version, 'tone_filter_bitmap').mask(dict(where)) & edge_df['char1'].isin(C).to_numpy() & edge_df['char2'].isin(C).to_numpy()]
+    net_fam = Network(height='650px', width='100%', notebook=False, directed=True, cdn_resources='in_line')
+    # Node sizing by degree within community
+    Gc = nx.DiGraph()
+    for _, r in sub.iterrows():
+        Gc.add_edge(r['char1'], r['char2'], tone_pair=r['tone_pattern'], weight=int(r['weight']), title=f"{r['Verb']} ({r['pinyin']})")
+    degs = dict(Gc.degree())
+    for n in Gc.nodes():
+        sz = 12 + 20*(degs.get(n,0)/max(1,max(degs.values())))
+        net_fam.add_node(n, label=n, size=sz, font={'size': int(sz)+6})
+    for u,v,d in Gc.edges(data=True):
+        color = pair_color.get(d.get('tone_pair'), '#cccccc')
+        net_fam.add_edge(u,v, title=d.get('title'), color=color, width=1+d.get('weight',1))
+    return net_fam.generate_html()
+
+
+def warm(version, raw, langs):
+    """Build what the page shows with every tone pair, tone and class selected, in each of ``langs``."""
+    df, edge_df = publish_tables(version, raw)
+    options = get_options(version, df)
+    for lang in langs:
+        class_labels(version, lang)
+    G = build_graph(version)
+    get_edge_index(version, edge_df)
+    get_verb_index(version, df)
+    get_search_index(version, df)
+    get_minimal_pairs(version)
+    get_char_profiles(version)
+    get_near_pairs(version, 1, df)
+    tone_where = {'tone_pattern': options['tones'], 'src_tone': sorted(edge_df['src_tone'].dropna().unique()),
+                  'dst_tone': sorted(edge_df['dst_tone'].dropna().unique())}
+    filter_where = dict(tone_where)
+    if options['classes'] and CLASS_CODE_COL in table(version, 'tone_filter_bitmap').index:
+        filter_where[CLASS_CODE_COL] = options['classes']
+    network_html(version, filter_key(filter_where), True)
+    if G.number_of_nodes() > 1 and get_families(version)[0]:
+        family_html(version, filter_key(tone_where), 0)
@@ -1,7 +1,13 @@
 #utils.py
+import time
 import streamlit as st
 import pandas as pd
 from db import run_query
+from dataset import dataset_version
+from bundle import preload_bundle
+
+# Seconds between progress updates of a background computation
+POLL_SECONDS = 1.0
 
 
 # @st.cache_data(ttl=86400)  # cache for 1 day
@@ -14,7 +20,7 @@ def page_header(title: str, emoji: str = "📄"):
     st.markdown(f"# {emoji} {title}")
 
 
-@st.cache_data(ttl=86400) # cash for one day
+@st.cache_resource(ttl=86400) # cash for one day
 def load_data(local_csv="data/two_char_verbs_with_Tr_Pro_with_UMAP.csv",
               table_name="verbs",
               use_local=False):
@@ -22,10 +28,16 @@ def load_data(local_csv="data/two_char_verbs_with_Tr_Pro_with_UMAP.csv",
     Load verbs data:
     - If use_local=True -> always load local CSV
     - If use_local=False and Neon secret exists -> query Neon
+
+    The content fingerprint is stored in ``df.attrs["version"]`` so pages can
+    key derived caches on it without rehashing the frame. The frame is shared
+    by all sessions (no copy per rerun): pages prepare their own copy once per
+    version and must not modify this one.
     """
     if not use_local and "db_connection" in st.secrets and run_query is not None:
         try:
             df = run_query(f"SELECT * FROM {table_name};")
+            df.attrs["version"] = dataset_version(df)
             st.info("Loaded data from Neon database ✅")
             return df
         except Exception as e:
@@ -34,9 +46,86 @@ def load_data(local_csv="data/two_char_verbs_with_Tr_Pro_with_UMAP.csv",
     # Local CSV fallback
     try:
         df = pd.read_csv(local_csv)
+        df.attrs["version"] = dataset_version(df)
         st.info("Loaded data from local CSV ✅")
         return df
     except FileNotFoundError:
         st.error("Local CSV not found. Please add it to your project folder.")
         return pd.DataFrame()  # empty DataFrame
 
+
+@st.cache_resource
+def load_bundle(version):
+    """
+    Preload the offline analytics bundle of a dataset version (built with
+    ``python bundle.py``) into the compute cache, once per version.
+    Returns its manifest, or None when no bundle was built for the version.
+    """
+    return preload_bundle(version)
+
+
+def _jump_to_hit(target_key):
+    hit = st.session_state.get(f"{target_key}_hit")
+    if hit is not None:
+        st.session_state[target_key] = hit
+
+
+def search_jump(index, target_key, options, label, placeholder, no_hits, kinds=("verb",), limit=8):
+    """
+    Search box that moves the widget stored under ``target_key`` to the
+    picked hit. Only hits found in ``options`` are offered, so the target
+    widget can always take the value.
+    """
+    query = st.text_input(label, key=f"{target_key}_query", placeholder=placeholder)
+    if not query.strip():
+        return
+    allowed = set(options)
+    hits = [h for h in index.search(query, limit * 4, kinds) if h.key in allowed][:limit]
+    if not hits:
+        st.caption(no_hits)
+        return
+    labels = {h.key: h.label for h in hits}
+    st.pills(label, options=list(labels), format_func=labels.get, key=f"{target_key}_hit",
+             label_visibility="collapsed", on_change=_jump_to_hit, args=(target_key,))
+
+
+def lazy_tabs(labels, key):
+    """
+    ``st.tabs`` that only runs the selected tab: guard each body with
+    ``if tab.open:``. The selection is kept by position, so it survives a
+    switch of display language.
+    """
+    labels = list(labels)
+    picked, before = st.session_state.get(key), st.session_state.get(f"{key}_labels")
+    if picked not in labels and before and picked in before and len(before) == len(labels):
+        st.session_state[key] = labels[before.index(picked)]
+    st.session_state[f"{key}_labels"] = labels
+    return st.tabs(labels, key=key, on_change="rerun")
+
+
+def background_result(fn, label, version, *args):
+    """
+    ``fn(version, *args)`` for a ``computed`` function if it is ready (cached);
+    otherwise start it in the background, show its progress and return None.
+    The progress panel reruns on its own, and reruns the page once the result
+    is in, so the rest of the page stays usable meanwhile. Sessions asking for
+    the same result share one computation.
+    """
+    job = fn.submit(version, *args)
+    if job.done() and job.exception() is None:
+        return job.result()
+
+    @st.fragment(run_every=POLL_SECONDS)
+    def progress():
+        if job.done():
+            if job.exception() is None:
+                st.rerun()
+            st.exception(job.exception())
+            return
+        elapsed = f"{time.monotonic() - job.started:.0f}s"
+        if job.progress is None:
+            st.caption(f"⏳ {label} ({elapsed})")
+        else:
+            st.progress(job.progress, text=f"⏳ {label} ({job.progress:.0%}, {elapsed})")
+    progress()
+    return None
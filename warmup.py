@@ -0,0 +1,128 @@
+# warmup.py
+"""
+Warm the process-wide caches before the first visitor arrives.
+
+A background thread loads the dataset, preloads its analytics bundle and
+calls each page's builders (``network_views``, ``explore_views``,
+``coach_views``, ``tone_views``) with the page's default filters in every
+display language. The per-version tables and indexes, the graphs with their
+communities and centralities, the default coverage order and the rendered
+network pages end up in the shared caches, so the first real request only
+reads them. No session is involved: these are the same cached functions
+the pages call, called once the Streamlit runtime is up so that they share
+its cache storage.
+
+``start()`` is idempotent: ``serve.py`` calls it at process start and the
+Home page calls it on its first run (for ``streamlit run`` deployments).
+``status()`` reports progress; each page is also logged to stderr.
+"""
+import importlib
+import logging
+import sys
+import threading
+import time
+
+# Display languages the pages offer
+LANGUAGES = ("en", "zh")
+# (page, builders module) in menu order
+PAGES = (
+    ("Character Network", "network_views"),
+    ("Explore Common Verbs", "explore_views"),
+    ("Verb Action Coach", "coach_views"),
+    ("Tone Patterns", "tone_views"),
+)
+# Seconds to wait for the Streamlit runtime to start
+START_TIMEOUT = 300
+# Streamlit warns on every cached call made outside a script run
+CONTEXT_LOGGER = "streamlit.runtime.scriptrunner_utils.script_run_context"
+
+_lock = threading.Lock()
+_thread = None
+_status = {"state": "idle", "done": 0, "total": 0, "current": None, "errors": [], "seconds": None}
+
+
+def status():
+    """Snapshot of the warm-up: state (idle/waiting/running/done/failed), pages done/total, errors."""
+    with _lock:
+        return {**_status, "errors": list(_status["errors"])}
+
+
+def _update(**values):
+    with _lock:
+        _status.update(values)
+
+
+def _log(message):
+    print(f"[warmup] {message}", file=sys.stderr, flush=True)
+
+
+class _WarmupThreadFilter(logging.Filter):
+    """Drops the missing-context warnings of the warm-up thread, which runs no script by design."""
+
+    def filter(self, record):
+        return threading.current_thread() is not _thread or "ScriptRunContext" not in record.getMessage()
+
+
+def _wait_for_runtime():
+    from streamlit import runtime
+
+    deadline = time.monotonic() + START_TIMEOUT
+    while not runtime.exists():
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Streamlit runtime did not start within {START_TIMEOUT}s")
+        time.sleep(0.5)
+
+
+def _warm():
+    from utils import load_bundle, load_data
+
+    raw = load_data()
+    if raw.empty:
+        raise RuntimeError("dataset could not be loaded")
+    version = raw.attrs.get("version", "")
+    load_bundle(version)
+    _update(total=len(PAGES))
+    for page, module in PAGES:
+        _update(current=page)
+        t0 = time.perf_counter()
+        try:
+            importlib.import_module(module).warm(version, raw, LANGUAGES)
+        except Exception as e:
+            # One page failing leaves the others to warm
+            with _lock:
+                _status["errors"].append(f"{page}: {e!r}")
+            _log(f"{page}: failed: {e!r}")
+        else:
+            _log(f"{page}: {time.perf_counter() - t0:.1f}s")
+        with _lock:
+            _status["done"] += 1
+
+
+def _main():
+    t0 = time.perf_counter()
+    try:
+        _update(state="waiting")
+        _wait_for_runtime()
+        _update(state="running")
+        _log("warming page caches")
+        _warm()
+    except Exception as e:
+        _update(state="failed", current=None, seconds=time.perf_counter() - t0)
+        with _lock:
+            _status["errors"].append(repr(e))
+        _log(f"failed: {e!r}")
+        return
+    _update(state="done", current=None, seconds=time.perf_counter() - t0)
+    s = status()
+    _log(f"{s['done']}/{s['total']} pages warm in {s['seconds']:.1f}s, {len(s['errors'])} error(s)")
+
+
+def start():
+    """Start the warm-up thread once per process; returns the current status."""
+    global _thread
+    with _lock:
+        if _thread is None:
+            logging.getLogger(CONTEXT_LOGGER).addFilter(_WarmupThreadFilter())
+            _thread = threading.Thread(target=_main, name="cache-warmup", daemon=True)
+            _thread.start()
+    return status()
@@ -1,4 +1,5 @@
 import streamlit as st
+import warmup
 
 # ----------------------------
 # Page Config
@@ -9,6 +10,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Warm the other pages' caches in the background (no-op once started, e.g. by serve.py)
+warm = warmup.start()
+
 # ----------------------------
 # Hero Section
 # ----------------------------
@@ -232,4 +236,6 @@ with st.sidebar:
     Feedback? Questions? Collaboration ideas?
     有反馈？问题？合作想法？
     """)
-    st.markdown("**📧 aymen.omg@gmail.com**")
\ No newline at end of file
+    st.markdown("**📧 aymen.omg@gmail.com**")
+    if warm["state"] in ("waiting", "running"):
+        st.caption(f"⏳ Preparing pages / 正在准备页面… {warm['done']}/{warm['total'] or '…'}")